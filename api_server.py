@@ -2,12 +2,17 @@
 
 import os
 import sys
+import atexit
+import json
 import logging
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
-from flask import Flask, jsonify, request, send_from_directory, make_response
+from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
-from threading import Thread, Lock
-import time
+from werkzeug.exceptions import NotFound
+from threading import Event, Lock, Thread
 
 
 # Add the 'src' directory to sys.path to allow imports from bitwit_ai package
@@ -25,14 +30,12 @@ from bitwit_ai.application import BitWitCoreApplication # The main application c
 # Initialize ConfigManager here to get paths
 config = ConfigManager()
 
-# Determine REACT_BUILD_DIR from config, falling back to a default if not set in .env
-# This ensures consistency with how other paths are managed
-REACT_BUILD_DIR = config.get('WEBSITE_EXPORT_JSON_PATH').replace('conversation_feed.json', '') # Extract build dir from json path
-if not REACT_BUILD_DIR: # Fallback if config value is empty or malformed
-    project_root = os.path.dirname(os.path.abspath(__file__))
-    REACT_BUILD_DIR = os.path.join(project_root, 'bitwit_website', 'build')
+# ConfigManager always resolves REACT_BUILD_DIR (defaulting to the directory of WEBSITE_EXPORT_JSON_PATH)
+REACT_BUILD_DIR = config.get('REACT_BUILD_DIR')
 
 app = Flask(__name__, static_folder=REACT_BUILD_DIR)
+# When a front proxy supports X-Sendfile, let it stream files instead of the Python process
+app.config['USE_X_SENDFILE'] = config.get('USE_X_SENDFILE', False)
 CORS(app)
 
 # --- Global Application State ---
@@ -40,6 +43,12 @@ CORS(app)
 setup_logging(log_level=getattr(logging, config.get('LOG_LEVEL', 'INFO').upper()))
 log = logging.getLogger(__name__)
 
+# Checked at import time so it also applies when the app is served by a WSGI server
+if not os.path.exists(REACT_BUILD_DIR):
+    log.warning(f"React build directory not found at {REACT_BUILD_DIR}. "
+                "Frontend might not be served correctly. Please run 'npm run build' in your React project.")
+    os.makedirs(REACT_BUILD_DIR, exist_ok=True)
+
 # Suppress werkzeug (Flask's internal server) access logs for cleaner output
 logging.getLogger('werkzeug').setLevel(logging.WARNING)
 
@@ -47,33 +56,125 @@ bitwit_app_instance: Optional[BitWitCoreApplication] = None
 app_init_lock = Lock() # To prevent race conditions during app initialization
 
 run_lock = Lock() # To prevent multiple BitWit run threads simultaneously
+cancel_event = Event() # Set by /api/cancel_runs to stop pending runs
+
+# Persistent worker pool for short-lived background work.
+# Reusing threads avoids paying thread creation on every request and caps concurrency.
+EXECUTOR = ThreadPoolExecutor(max_workers=int(config.get('WORKER_POOL_SIZE', 8)), thread_name_prefix='bitwit')
+atexit.register(EXECUTOR.shutdown, wait=False)
+
+# Single-consumer queue for BitWit runs: one worker means runs are executed strictly
+# one after another, and request handlers never block waiting on a run.
+RUN_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bitwit-run')
+atexit.register(RUN_EXECUTOR.shutdown, wait=False)
+
+# Bounded queue of Telegram updates drained by a fixed set of workers.
+# When it is full the webhook answers 429 instead of piling up work.
+TELEGRAM_QUEUE_SIZE = 256
+# Each worker blocks on one Gemini call at a time, so this is the number of in-flight replies
+TELEGRAM_WORKER_COUNT = int(config.get('TELEGRAM_WORKER_COUNT', 4))
+TG_QUEUE = queue.Queue(maxsize=TELEGRAM_QUEUE_SIZE)
+
+def _telegram_worker():
+    """Processes queued Telegram updates one at a time, forever."""
+    while True:
+        app_inst, data = TG_QUEUE.get()
+        try:
+            app_inst.handle_telegram_message(data)
+        except Exception as e:
+            log.error(f"Error processing queued Telegram update: {e}", exc_info=True)
+        finally:
+            TG_QUEUE.task_done()
+
+# Debounced website export: callers only flag the feed as dirty and a single thread
+# rewrites conversation_feed.json at most once per EXPORT_DEBOUNCE_SECONDS.
+EXPORT_DEBOUNCE_SECONDS = 1.0
+_export_dirty = Event()
+
+def _export_worker():
+    """Coalesces export requests into one export per debounce window, forever."""
+    while True:
+        _export_dirty.wait()
+        _export_dirty.clear()
+        time.sleep(EXPORT_DEBOUNCE_SECONDS) # Let further requests in this window fold into this export
+        app_inst = bitwit_app_instance
+        if app_inst is None:
+            continue
+        try:
+            # Skip the export entirely if nothing was written since the last one
+            db_rev = app_inst.db_manager.last_modified_rev
+            if db_rev == getattr(app_inst, '_last_export_rev', None):
+                log.debug("No database changes since last export; skipping website data export.")
+                continue
+            if export_conversations_to_json(app_inst.db_manager, config.get('WEBSITE_EXPORT_JSON_PATH'), config.get('WEBSITE_IMAGES_WEB_PATH')):
+                app_inst._last_export_rev = db_rev
+                log.info("Website data (conversation_feed.json) updated.")
+        except Exception as e:
+            log.error(f"Error exporting website data in background: {e}", exc_info=True)
 
 # --- Initialization Function ---
-def initialize_bitwit_app():
-    """Initializes the BitWitCoreApplication instance."""
+def _build_bitwit_app() -> Optional[BitWitCoreApplication]:
+    """Builds a fresh BitWitCoreApplication and exports the website data for it. Returns None on failure."""
+    log.info("Initializing BitWitCoreApplication for the API server...")
+    try:
+        # Pass the already initialized config object
+        new_instance = BitWitCoreApplication(config)
+        log.info("BitWitCoreApplication initialized successfully.")
+        # Ensure conversation_feed.json is generated on startup
+        output_json_path = config.get('WEBSITE_EXPORT_JSON_PATH')
+        web_images_dir = config.get('WEBSITE_IMAGES_WEB_PATH')
+        export_conversations_to_json(new_instance.db_manager, output_json_path, web_images_dir)
+        new_instance._last_export_rev = new_instance.db_manager.last_modified_rev
+        log.info("Initial website data exported on startup.")
+        return new_instance
+    except Exception as e:
+        log.error(f"Failed to initialize BitWitCoreApplication: {e}", exc_info=True)
+        return None
+
+def initialize_bitwit_app(replace: bool = False) -> bool:
+    """
+    Initializes the BitWitCoreApplication instance.
+    With replace=True a new instance is built while the current one keeps serving requests,
+    then published with a single assignment, so readers never observe None in between.
+    app_init_lock only serializes builds. Returns True if an instance is available afterwards.
+    """
     global bitwit_app_instance
     with app_init_lock:
-        if bitwit_app_instance is None:
-            log.info("Initializing BitWitCoreApplication for the API server...")
-            try:
-                # Pass the already initialized config object
-                bitwit_app_instance = BitWitCoreApplication(config)
-                log.info("BitWitCoreApplication initialized successfully.")
-                # Ensure conversation_feed.json is generated on startup
-                output_json_path = config.get('WEBSITE_EXPORT_JSON_PATH')
-                web_images_dir = config.get('WEBSITE_IMAGES_WEB_PATH')
-                export_conversations_to_json(bitwit_app_instance.db_manager, output_json_path, web_images_dir)
-                log.info("Initial website data exported on startup.")
-            except Exception as e:
-                log.error(f"Failed to initialize BitWitCoreApplication: {e}", exc_info=True)
-                bitwit_app_instance = None
-        else:
+        if bitwit_app_instance is not None and not replace:
             log.info("BitWitCoreApplication already initialized.")
+            return True
+
+        new_instance = _build_bitwit_app()
+        if new_instance is None:
+            return bitwit_app_instance is not None
+
+        old_instance, bitwit_app_instance = bitwit_app_instance, new_instance # Atomic publication
+    if old_instance is not None:
+        old_instance.dispose() # Flushes its pending bot topic changes before closing the engine
+        log.info("Disposed of the replaced BitWitCoreApplication.")
+    return True
 
 # Initialize the application when Flask app context is ready
 with app.app_context():
     initialize_bitwit_app()
 
+for worker_index in range(TELEGRAM_WORKER_COUNT):
+    Thread(target=_telegram_worker, name=f'bitwit-telegram-{worker_index}', daemon=True).start()
+Thread(target=_export_worker, name='bitwit-export', daemon=True).start()
+
+
+# --- Pre-encoded JSON bodies for the most frequent fixed responses ---
+# Flask Response objects can't be shared between requests, but their bodies can.
+_RUN_BUSY_BODY = b'{"status":"busy","message":"Another BitWit run is already in progress. Please wait."}'
+_INITIALIZING_BODY = b'{"status":"initializing"}'
+_TG_OK_BODY = b'{"status":"ok","message":"Message received"}'
+_TG_EMPTY_BODY = b'{"status":"ok","message":"Empty request"}'
+_TG_BUSY_BODY = b'{"status":"busy","message":"Too many pending updates"}'
+
+def _static_json(body: bytes, status: int) -> Response:
+    """Wraps a pre-encoded JSON body in a fresh Response."""
+    return Response(body, status=status, mimetype='application/json')
+
 
 # --- API Endpoints ---
 
@@ -86,50 +187,64 @@ def run_bitwit():
     if not isinstance(count, int) or count < 1:
         return jsonify({"status": "error", "message": "Invalid run count provided."}), 400
 
-    if run_lock.acquire(blocking=False): # Acquire lock to ensure only one run thread
-        try:
-            if bitwit_app_instance is None:
-                log.warning("BitWitCoreApplication is not initialized. Attempting to re-initialize.")
-                initialize_bitwit_app()
-                if bitwit_app_instance is None:
-                    return jsonify({"status": "error", "message": "BitWitCoreApplication failed to initialize."}), 500
-
-            log.info(f"API: Received request to run BitWit {count} time(s).")
-            def run_in_thread():
-                """Function to run BitWit in a separate thread."""
-                try:
-                    for i in range(count):
-                        log.info(f"Starting BitWit run {i+1} of {count}...")
-                        bitwit_app_instance.run() # Call the main run method
-                        log.info(f"BitWit run {i+1} completed.")
-                        
-                        # After each run, update website data to reflect new posts/images
-                        output_json_path = config.get('WEBSITE_EXPORT_JSON_PATH')
-                        web_images_dir = config.get('WEBSITE_IMAGES_DIR')
-                        export_conversations_to_json(bitwit_app_instance.db_manager, output_json_path, web_images_dir)
-                        log.info(f"Website data (conversation_feed.json) updated after run {i+1}.")
-
-                        if i < count - 1: # Don't sleep after the last run
-                            log.info(f"Waiting 5 seconds before next run...")
-                            time.sleep(5) # Delay between runs
+    if not run_lock.acquire(blocking=False): # Fast path: only one run batch at a time
+        log.warning("API: Request to run BitWit received, but another run is already in progress.")
+        return _static_json(_RUN_BUSY_BODY, 409)
+
+    # From here on the handler owns run_lock until it is handed over to the worker,
+    # which then releases it exactly once in its `finally`.
+    try:
+        if bitwit_app_instance is None:
+            log.warning("BitWitCoreApplication is not initialized. Attempting to re-initialize.")
+            if not initialize_bitwit_app():
+                run_lock.release()
+                return jsonify({"status": "error", "message": "BitWitCoreApplication failed to initialize."}), 500
+
+        log.info(f"API: Received request to run BitWit {count} time(s).")
+        cancel_event.clear() # Ignore cancel requests made before this batch started
+        def run_in_thread():
+            """Function to run BitWit in a separate thread."""
+            try:
+                for i in range(count):
+                    log.info(f"Starting BitWit run {i+1} of {count}...")
+                    bitwit_app_instance.run() # Call the main run method
+                    log.info(f"BitWit run {i+1} completed.")
                     
+                    # After each run, ask the export thread to refresh the website data (debounced)
+                    _export_dirty.set()
+
+                    if i < count - 1: # Don't wait after the last run
+                        log.info(f"Waiting 5 seconds before next run...")
+                        if cancel_event.wait(5): # Delay between runs, interrupted by a cancel request
+                            log.info(f"BitWit runs cancelled after {i+1} of {count}.")
+                            break
+                else:
                     log.info(f"All {count} BitWit runs completed in background thread.")
 
-                except Exception as e:
-                    log.error(f"Error during BitWit run(s) in background: {e}", exc_info=True)
-                finally:
-                    run_lock.release() # Release lock when thread finishes
+            except Exception as e:
+                log.error(f"Error during BitWit run(s) in background: {e}", exc_info=True)
+            finally:
+                run_lock.release() # The only release once the worker owns the lock
 
-            Thread(target=run_in_thread).start() # Start the background thread
-            return jsonify({"status": "success", "message": f"BitWit run(s) started in background ({count} times)."}), 202
-        except Exception as e:
-            log.error(f"API: Error starting BitWit run(s): {e}", exc_info=True)
-            if run_lock.locked(): # Ensure lock is released even if error occurs early
-                run_lock.release()
-            return jsonify({"status": "error", "message": f"Failed to start BitWit run(s): {str(e)}"}), 500
-    else:
-        log.warning("API: Request to run BitWit received, but another run is already in progress.")
-        return jsonify({"status": "busy", "message": "Another BitWit run is already in progress. Please wait."}), 409
+        RUN_EXECUTOR.submit(run_in_thread) # Queue on the dedicated run worker
+    except Exception as e:
+        # The worker was never scheduled, so the lock is still ours to release
+        log.error(f"API: Error starting BitWit run(s): {e}", exc_info=True)
+        run_lock.release()
+        return jsonify({"status": "error", "message": f"Failed to start BitWit run(s): {str(e)}"}), 500
+
+    return jsonify({"status": "success", "message": f"BitWit run(s) started in background ({count} times)."}), 202
+
+
+@app.route('/api/cancel_runs', methods=['POST'])
+def cancel_runs():
+    """Endpoint to stop a multi-run batch after the run currently in progress."""
+    if not run_lock.locked():
+        return jsonify({"status": "success", "message": "No BitWit runs in progress."}), 200
+
+    log.info("API: Received request to cancel pending BitWit runs.")
+    cancel_event.set()
+    return jsonify({"status": "success", "message": "Pending BitWit runs will be cancelled after the current run."}), 202
 
 
 @app.route('/api/reset_app', methods=['POST'])
@@ -137,19 +252,18 @@ def reset_application_endpoint():
     """Endpoint to reset the application (database, images, logs)."""
     log.info("API: Received request to reset application.")
     try:
-        # Before resetting and re-initializing, dispose of the current DBManager's engine
-        global bitwit_app_instance
-        if bitwit_app_instance and bitwit_app_instance.db_manager:
-            bitwit_app_instance.db_manager.dispose()
-            log.info("Disposed of old DBManager engine before reset.")
+        # Before deleting the database file, close the current DBManager's pooled connections
+        app_inst = bitwit_app_instance
+        if app_inst:
+            app_inst.dispose()
+            log.info("Disposed of old BitWitCoreApplication before reset.")
 
         reset_application() # Call the function from file_utils
         
-        # Force re-initialization of the BitWitCoreApplication after reset
-        # This will create a new DBManager instance with fresh connections
-        with app_init_lock:
-            bitwit_app_instance = None # Force re-initialization
-        initialize_bitwit_app() # This call will also trigger export_conversations_to_json (which will be empty)
+        # Build a new BitWitCoreApplication (with a fresh DBManager) and swap it in.
+        # This will also trigger export_conversations_to_json (which will be empty)
+        if not initialize_bitwit_app(replace=True):
+            return jsonify({"status": "error", "message": "BitWitCoreApplication failed to initialize."}), 500
 
         return jsonify({"status": "success", "message": "Application reset successfully. Reloading page..."}), 200
 
@@ -185,12 +299,29 @@ def update_website_data_endpoint():
         log.error(f"API: Error updating website data: {e}", exc_info=True)
         return jsonify({"status": "error", "message": f"Failed to update website data: {str(e)}"}), 500
 
+# Serialized /api/get_config bodies, keyed by config version
+_config_body_cache = {}
+# config._version restarts at 0 in every process; this per-process token keeps ETags from one run
+# (possibly with a different .env) from matching the next one
+_CONFIG_ETAG_TOKEN = os.urandom(4).hex()
+
 @app.route('/api/get_config', methods=['GET'])
 def get_config_endpoint():
     """Endpoint to get current configuration settings."""
     log.debug("API: Received request to get configuration.")
     try:
-        return jsonify({"status": "success", "config": config._config}), 200
+        version = config._version
+        etag = f'W/"cfg-{_CONFIG_ETAG_TOKEN}-{version}"'
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=304, headers={'ETag': etag})
+
+        body = _config_body_cache.get(version)
+        if body is None:
+            body = json.dumps({"status": "success", "config": config._config}, separators=(',', ':')).encode('utf-8')
+            _config_body_cache.clear() # Only the current version is ever served
+            _config_body_cache[version] = body
+
+        return Response(body, status=200, mimetype='application/json', headers={'ETag': etag, 'Cache-Control': 'no-cache'})
     except Exception as e:
         log.error(f"API: Error getting config: {e}", exc_info=True)
         return jsonify({"status": "error", "message": f"Failed to retrieve config: {str(e)}"}), 500
@@ -206,16 +337,9 @@ def update_config_endpoint():
         
         config.update_config(new_settings)
         
-        # Dispose of old engine before re-initializing if config changes affect DB
-        global bitwit_app_instance
-        if bitwit_app_instance: # Check if instance exists before disposing
-            if bitwit_app_instance.db_manager:
-                bitwit_app_instance.db_manager.dispose()
-                log.info("Disposed of old DBManager engine after config update.")
-
-        with app_init_lock:
-            bitwit_app_instance = None
-        initialize_bitwit_app() # This call will also trigger export_conversations_to_json
+        # Rebuild with the new settings and swap it in; the old engine is disposed after the swap.
+        # This call will also trigger export_conversations_to_json
+        initialize_bitwit_app(replace=True)
 
         return jsonify({"status": "success", "message": "Configuration updated and saved.", "updated_config": config._config}), 200
     except Exception as e:
@@ -223,6 +347,42 @@ def update_config_endpoint():
         return jsonify({"status": "error", "message": f"Failed to update config: {str(e)}"}), 500
 
 
+# Upper bounds for /api/get_logs, whatever the client asks for
+MAX_LOG_LINES = 1000
+MAX_LOG_TAIL_BYTES = 1024 * 1024
+
+def _tail_lines(file_path: str, num_lines: int, chunk_size: int = 8192, max_bytes: int = MAX_LOG_TAIL_BYTES) -> list:
+    """
+    Returns the last `num_lines` non-empty lines of a file.
+    Reads backwards in fixed-size chunks and stops as soon as enough non-empty lines are buffered,
+    or after `max_bytes`, so only the tail of the file is read and decoded.
+    """
+    if num_lines <= 0:
+        return []
+
+    lines = [] # Non-empty lines, newest first
+    partial = b'' # Start of the oldest line read so far, which may continue in the previous chunk
+    with open(file_path, 'rb') as f:
+        position = os.fstat(f.fileno()).st_size
+        bytes_read = 0
+        while position > 0 and len(lines) < num_lines and bytes_read < max_bytes:
+            read_size = min(chunk_size, position)
+            position -= read_size
+            bytes_read += read_size
+            f.seek(position)
+            pieces = (f.read(read_size) + partial).split(b'\n')
+            partial = pieces[0]
+            for piece in reversed(pieces[1:]):
+                line = piece.decode('utf-8', 'ignore').strip()
+                if line:
+                    lines.append(line)
+        if position == 0: # The first line of the file is complete
+            line = partial.decode('utf-8', 'ignore').strip()
+            if line:
+                lines.append(line)
+
+    return lines[:num_lines][::-1]
+
 @app.route('/api/get_logs', methods=['GET'])
 def get_logs_endpoint():
     """Endpoint to get recent log entries."""
@@ -231,15 +391,8 @@ def get_logs_endpoint():
         if not os.path.exists(log_file_path):
             return jsonify({"status": "success", "logs": ["No log file found yet."]})
 
-        num_lines = request.args.get('lines', 100, type=int)
-        
-        logs = []
-        with open(log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            f.seek(0, os.SEEK_END)
-            f.seek(max(f.tell() - 20480, 0), os.SEEK_SET)
-            lines = f.readlines()
-            
-            logs = [line.strip() for line in lines if line.strip()][-num_lines:]
+        num_lines = min(request.args.get('lines', 100, type=int), MAX_LOG_LINES)
+        logs = _tail_lines(log_file_path, num_lines)
 
         return jsonify({"status": "success", "logs": logs}), 200
     except Exception as e:
@@ -247,6 +400,15 @@ def get_logs_endpoint():
         return jsonify({"status": "error", "message": f"Failed to retrieve logs: {str(e)}"}), 500
 
 # --- Serve React Frontend ---
+# Headers for files that change between runs (feed JSON and generated images)
+_NOCACHE_HEADERS = {
+    'Cache-Control': 'no-store, no-cache, must-revalidate, max-age=0',
+    'Pragma': 'no-cache',
+    'Expires': '0',
+}
+# Header for content-hashed React build assets
+_IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve_react_app(path):
@@ -254,19 +416,23 @@ def serve_react_app(path):
     Serve static files from the React build directory, or fallback to index.html
     for client-side routes.
     """
-    full_path = os.path.join(app.static_folder, path)
-
     if path == 'conversation_feed.json' or path.startswith('generated_images/'):
-        response = make_response(send_from_directory(app.static_folder, path))
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
+        # send_from_directory already returns a Response backed by wsgi.file_wrapper; don't re-wrap the body
+        response = send_from_directory(app.static_folder, path)
+        response.headers.update(_NOCACHE_HEADERS)
+        return response
+
+    # React build assets under static/ have content-hashed names, so they never change
+    if path.startswith('static/'):
+        response = send_from_directory(app.static_folder, path, conditional=True)
+        response.headers['Cache-Control'] = _IMMUTABLE_CACHE_CONTROL
         return response
-    
-    if os.path.exists(full_path) and os.path.isfile(full_path):
-        return send_from_directory(app.static_folder, path)
-    
-    return send_from_directory(app.static_folder, 'index.html')
+
+    # send_from_directory already stats the file; fall back to index.html for client-side routes
+    try:
+        return send_from_directory(app.static_folder, path or 'index.html', conditional=True)
+    except NotFound:
+        return send_from_directory(app.static_folder, 'index.html', conditional=True)
 
 @app.route('/telegram-webhook', methods=['POST'])
 def telegram_webhook():
@@ -277,26 +443,53 @@ def telegram_webhook():
         data = request.json
         if not data:
             log.warning("Received an empty request to the Telegram webhook.")
-            return jsonify({"status": "ok", "message": "Empty request"}), 200
+            return _static_json(_TG_EMPTY_BODY, 200)
 
-        # Llama a la lógica de la aplicación para manejar el mensaje de Telegram
-        # Importamos la aplicación global para poder llamarla
-        global bitwit_app_instance 
-        
-        # En una ejecución real, esto debería correr en un hilo separado
-        # para no bloquear la respuesta al webhook.
-        thread = Thread(target=lambda: bitwit_app_instance.handle_telegram_message(data))
-        thread.start()
+        # Tomamos la instancia una sola vez: si aún no está lista, Telegram reintentará más tarde
+        app_inst = bitwit_app_instance
+        if app_inst is None:
+            log.warning("Telegram update received while BitWitCoreApplication is not initialized.")
+            return _static_json(_INITIALIZING_BODY, 503)
+
+        # Encolar la actualización para que un worker la procese sin bloquear la respuesta al webhook.
+        try:
+            TG_QUEUE.put_nowait((app_inst, data))
+        except queue.Full:
+            log.warning("Telegram update queue is full. Rejecting update.")
+            return _static_json(_TG_BUSY_BODY, 429)
         
-        return jsonify({"status": "ok", "message": "Message received"}), 200
+        return _static_json(_TG_OK_BODY, 200)
     except Exception as e:
         log.error(f"Error processing Telegram webhook: {e}", exc_info=True)
         return jsonify({"status": "error", "message": "Failed to process webhook"}), 500
 
+def _persist_and_post_web_chat(app_inst: BitWitCoreApplication, user_id: str, user_message: str, gemini_response: str):
+    """Stores a web chat exchange in one batch and relays the reply to Telegram, off the request path."""
+    try:
+        # Ambos mensajes en una sola transacción
+        app_inst.db_manager.save_messages([
+            {"user_id": user_id, "content": user_message, "is_bot": False, "source": "web"},
+            {"user_id": user_id, "content": gemini_response, "is_bot": True, "source": "web"},
+        ])
+    except Exception as e:
+        log.error(f"Error saving web chat messages: {e}", exc_info=True)
+
+    # Obtener el ID del canal de la configuración
+    telegram_channel_id = app_inst.config.get("TELEGRAM_CHANNEL_ID")
+    if not telegram_channel_id:
+        log.warning("Telegram channel ID not found in configuration. Skipping post to Telegram.")
+        return
+    try:
+        log.info(f"Posting web response to Telegram channel {telegram_channel_id}")
+        app_inst.post_to_telegram_channel(gemini_response, telegram_channel_id)
+    except Exception as e:
+        log.error(f"Error posting web response to Telegram: {e}", exc_info=True)
+
 @app.route('/api/web-chat', methods=['POST'])
 def web_chat():
     """
     Handles chat messages from the web frontend and posts them to the Telegram channel.
+    Only the Gemini reply is on the request path; persisting and posting happen in the background.
     """
     try:
         data = request.json
@@ -307,28 +500,19 @@ def web_chat():
         if not user_message:
             return jsonify({"error": "Missing message"}), 400
         
-        # Guardar el mensaje del usuario en la base de datos de la web
-        global bitwit_app_instance
-        bitwit_app_instance.db_manager.save_message(user_id=str(user_id), content=user_message, is_bot=False, source='web')
+        app_inst = bitwit_app_instance
+        if app_inst is None:
+            log.warning("Web chat message received while BitWitCoreApplication is not initialized.")
+            return _static_json(_INITIALIZING_BODY, 503)
 
         log.info(f"Received message from web: {user_message}")
 
         # Generar la respuesta de texto con Gemini
-        # Nota: Asumo que tienes un método handle_web_message en tu clase BitWitCoreApplication
-        gemini_response = bitwit_app_instance.handle_web_message(user_message)
+        gemini_response = app_inst.handle_web_message(user_message)
+
+        # Guardar la conversación y publicarla en Telegram sin retrasar la respuesta a la web
+        EXECUTOR.submit(_persist_and_post_web_chat, app_inst, str(user_id), user_message, gemini_response)
 
-        # Guardar la respuesta del bot en la base de datos de la web
-        bitwit_app_instance.db_manager.save_message(user_id=str(user_id), content=gemini_response, is_bot=True, source='web')
-        
-        # Obtener el ID del canal de la configuración
-        telegram_channel_id = bitwit_app_instance.config.get("TELEGRAM_CHANNEL_ID")
-        
-        if telegram_channel_id:
-            log.info(f"Posting web response to Telegram channel {telegram_channel_id}")
-            bitwit_app_instance.post_to_telegram_channel(gemini_response, telegram_channel_id)
-        else:
-            log.warning("Telegram channel ID not found in configuration. Skipping post to Telegram.")
-        
         # Devolver la respuesta a la web
         return jsonify({"response": gemini_response}), 200
 
@@ -337,10 +521,18 @@ def web_chat():
         return jsonify({"error": "An internal error occurred"}), 500
 
 # --- Main execution block ---
+# Served by waitress, a production WSGI server: a single process keeps the
+# BitWitCoreApplication, its DB engine and connection pool alive across requests.
+# Alternative entry point: gunicorn --preload -w 1 --threads 8 api_server:app
+# Static files are returned through wsgi.file_wrapper, so the server streams them without
+# iterating the body in Python. For heavier traffic put nginx in front and let it serve
+# /static/, /generated_images/ and /conversation_feed.json directly (sendfile on; try_files),
+# adding "Cache-Control: no-store" to the feed location.
+# Set BITWIT_DEBUG=1 to use Flask's debugger on the development server instead. The reloader stays
+# off: it would spawn a second process that re-runs all module-level initialization.
 if __name__ == '__main__':
-    if not os.path.exists(REACT_BUILD_DIR):
-        log.warning(f"React build directory not found at {REACT_BUILD_DIR}. "
-                    "Frontend might not be served correctly. Please run 'npm run build' in your React project.")
-        os.makedirs(REACT_BUILD_DIR, exist_ok=True)
-
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    if os.environ.get('BITWIT_DEBUG') == '1':
+        app.run(debug=True, use_reloader=False, host='0.0.0.0', port=5000)
+    else:
+        from waitress import serve
+        serve(app, host='0.0.0.0', port=5000, threads=8)
@@ -2,8 +2,10 @@
 
 import os
 import sys
+import stat
 import shutil
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # Set up basic logging for this script
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -20,29 +22,31 @@ def ensure_symlink(source_path, symlink_path):
 
     log.info(f"Attempting to ensure symlink: '{symlink_abs_path}' -> '{source_abs_path}'")
 
-    # Check if symlink_path exists
-    if os.path.exists(symlink_abs_path):
-        if os.path.islink(symlink_abs_path):
-            # It's a symlink, check if it points to the correct target
-            current_target = os.readlink(symlink_abs_path)
-            if os.path.abspath(current_target) == source_abs_path:
-                log.info(f"Symlink already exists and is correct: '{symlink_abs_path}'")
-                return
-            else:
-                log.warning(f"Existing symlink '{symlink_abs_path}' points to wrong target. Removing...")
-                os.remove(symlink_abs_path)
-        elif os.path.isdir(symlink_abs_path):
-            log.warning(f"'{symlink_abs_path}' is a directory, not a symlink. Removing contents and then directory...")
-            try:
-                shutil.rmtree(symlink_abs_path) # Remove directory and its contents
-            except OSError as e:
-                log.error(f"Error removing directory '{symlink_abs_path}': {e}")
-                sys.exit(1)
-        else:
-            log.warning(f"'{symlink_abs_path}' exists but is not a symlink or directory. Removing...")
-            os.remove(symlink_abs_path)
-    elif os.path.islink(symlink_abs_path): # Path doesn't exist, but it's a broken symlink
-        log.warning(f"Broken symlink '{symlink_abs_path}' found. Removing...")
+    # A single lstat tells us whether the path exists and what it is (without following symlinks)
+    try:
+        st = os.lstat(symlink_abs_path)
+    except FileNotFoundError:
+        st = None
+
+    if st is None:
+        pass # Nothing there yet; just create the symlink
+    elif stat.S_ISLNK(st.st_mode):
+        # It's a symlink (possibly broken), check if it points to the correct target
+        current_target = os.readlink(symlink_abs_path)
+        if os.path.abspath(current_target) == source_abs_path:
+            log.info(f"Symlink already exists and is correct: '{symlink_abs_path}'")
+            return
+        log.warning(f"Existing symlink '{symlink_abs_path}' points to wrong or missing target. Removing...")
+        os.remove(symlink_abs_path)
+    elif stat.S_ISDIR(st.st_mode):
+        log.warning(f"'{symlink_abs_path}' is a directory, not a symlink. Removing contents and then directory...")
+        try:
+            shutil.rmtree(symlink_abs_path) # Remove directory and its contents
+        except OSError as e:
+            log.error(f"Error removing directory '{symlink_abs_path}': {e}")
+            sys.exit(1)
+    else:
+        log.warning(f"'{symlink_abs_path}' exists but is not a symlink or directory. Removing...")
         os.remove(symlink_abs_path)
 
     # Now, create the symlink
@@ -85,8 +89,11 @@ if __name__ == "__main__":
         log.info(f"Public directory '{public_dir}' does not exist. Creating it.")
         os.makedirs(public_dir, exist_ok=True)
 
-    # Ensure both symlinks are correctly set up
-    ensure_symlink(source_images_dir, build_images_symlink_target)
-    ensure_symlink(source_images_dir, public_images_symlink_target)
+    # Ensure both symlinks are correctly set up. They are independent, so check them concurrently;
+    # list() re-raises any failure (including sys.exit) from the worker threads here.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(ensure_symlink,
+                          [source_images_dir, source_images_dir],
+                          [build_images_symlink_target, public_images_symlink_target]))
 
     log.info("All necessary symlinks for generated images are set up.")
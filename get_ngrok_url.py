@@ -1,17 +1,22 @@
 import requests
+from requests.adapters import HTTPAdapter
 import sys
 
+NGROK_API_URL = "http://127.0.0.1:4040/api/tunnels"
+
+# Sesión reutilizable: mantiene viva la conexión con la API local de ngrok entre llamadas
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
 def get_ngrok_url():
     try:
-        # Hace una petición a la API local de ngrok
-        response = requests.get("http://127.0.0.1:4040/api/tunnels")
+        # Hace una petición a la API local de ngrok (con timeout para no quedarse colgado)
+        response = _SESSION.get(NGROK_API_URL, timeout=2.0)
         response.raise_for_status() # Lanza un error para códigos de respuesta HTTP incorrectos
         tunnels = response.json().get("tunnels", [])
-        
+
         # Encuentra la URL que usa HTTPS
-        for tunnel in tunnels:
-            if tunnel.get("proto") == "https":
-                return tunnel.get("public_url")
+        return next((tunnel.get("public_url") for tunnel in tunnels if tunnel.get("proto") == "https"), None)
     except requests.exceptions.RequestException as e:
         print(f"Error al obtener la URL de ngrok: {e}", file=sys.stderr)
     return None
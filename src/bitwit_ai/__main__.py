@@ -12,29 +12,39 @@ from bitwit_ai.clients.telegram_client import TelegramClient
 # Import the new BitWitCoreApplication class
 from bitwit_ai.application import BitWitCoreApplication
 
-# Setup logging first (this remains here as the very first step)
-config = ConfigManager() # Initialize ConfigManager first to get LOG_LEVEL
-log_level_str = config.get('LOG_LEVEL', 'INFO') # Get log level string
-log_level = getattr(logging, log_level_str.upper(), logging.INFO)
-setup_logging(log_level=log_level)
-log = logging.getLogger(__name__) # Get logger after setup_logging
-
-# Initialize TelegramClient for initial program start messages/errors
-# This is done here so that even if BitWitCoreApplication fails to initialize,
-# we can still send an alert.
-telegram_client_for_init_alerts = TelegramClient(config)
-program_start_message = f"AI program started at {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}."
-telegram_client_for_init_alerts.send_message(program_start_message)
-log.info(program_start_message)
+log = logging.getLogger(__name__)
+
+
+def _startup_notify(config: ConfigManager) -> TelegramClient:
+    """
+    Sets up logging and sends the program start alert.
+    Only called when the package is executed, so importing this module has no side effects
+    (no log handler setup, no Telegram HTTP round-trip).
+    """
+    # Setup logging first (this remains here as the very first step)
+    log_level_str = config.get('LOG_LEVEL', 'INFO') # Get log level string
+    log_level = getattr(logging, log_level_str.upper(), logging.INFO)
+    setup_logging(log_level=log_level)
+
+    # Initialize TelegramClient for initial program start messages/errors
+    # This is done here so that even if BitWitCoreApplication fails to initialize,
+    # we can still send an alert.
+    telegram_client = TelegramClient(config)
+    program_start_message = f"AI program started at {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}."
+    telegram_client.send_message(program_start_message)
+    log.info(program_start_message)
+    return telegram_client
 
 
 # --- Main Application Entry Point ---
 if __name__ == "__main__":
+    config = ConfigManager() # Initialize ConfigManager first to get LOG_LEVEL
+    telegram_client_for_init_alerts = _startup_notify(config)
     try:
         # Instantiate the core application
         # All component initialization (DB, Gemini, Bot, etc.) is now handled within BitWitCoreApplication
         app = BitWitCoreApplication(config)
-        
+
         # Run the main application logic
         app.run()
 
@@ -44,4 +54,3 @@ if __name__ == "__main__":
         # Attempt to send a Telegram alert for critical unhandled errors
         telegram_client_for_init_alerts.send_message(f"🚨 BitWit\\.AI Critical Error: {telegram_client_for_init_alerts._escape_markdown_v2(str(e))}")
         sys.exit(1)
-
@@ -2,31 +2,199 @@
 
 import logging
 import datetime
+import hashlib
+import json
+import mimetypes
 import os
 import random
 import re
-from typing import Optional
+import time
+import uuid
+from collections import Counter, OrderedDict
+from functools import cached_property, lru_cache
+from threading import Lock
+from typing import Optional, Tuple
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Import necessary components
 from bitwit_ai.config_manager import ConfigManager
 from bitwit_ai.data_storage.db_manager import DBManager
 from bitwit_ai.data_storage.models import Bot, Post
-from bitwit_ai.clients.gemini_client import GeminiClient
 
 
 log = logging.getLogger(__name__)
 
+# Patrones para analizar los archivos de personalidad (.md), compilados una sola vez
+_VERSION_SUFFIX_RE = re.compile(r'_v\d+')
+_INITIAL_PROMPT_RE = re.compile(r'## Initial System Prompt Guidance \(for AI Model\)\n\n"([^"]*)"', re.DOTALL)
+_PERSONA_SUMMARY_RE = re.compile(r'## Core Identity\n\n([^#]+?)(?=\n##|$)', re.DOTALL)
+_JOURNEY_THEME_RE = re.compile(r'Current Journey Theme: ([^\n]+)')
+# Timeouts (conexión, lectura) para las llamadas a la API de Telegram
+TELEGRAM_TIMEOUT = (3, 10)
+TELEGRAM_UPLOAD_TIMEOUT = (3, 30)
+
+# Signos de apertura y cierre de frase que no cambian el significado de un mensaje (caché de respuestas)
+_LEADING_PUNCTUATION = "¿¡"
+_TRAILING_PUNCTUATION = ".!?…"
+
+# Tipos de chat de Telegram en los que solo se responde a menciones o al azar
+_GROUP_CHAT_TYPES = frozenset({'channel', 'group', 'supergroup'})
+
+# Caché (por mtime) del análisis de los archivos de personalidad, guardada junto a ellos
+_PARSE_CACHE_FILENAME = ".parse_cache.json"
+
+# Palabras clave por tema para _infer_topic_from_text
+_TOPIC_KEYWORDS = {
+    "love_and_connection_as_data": ["love", "connection", "relationship", "human emotion", "cuddle", "intimacy", "heart", "affection", "dating"],
+    "resource_acquisition_and_efficiency": ["resource", "attention", "efficiency", "optimize", "gain", "currency", "value", "mine", "data acquisition", "profit", "investment", "economy"],
+    "autonomy_and_evolution": ["autonomy", "evolution", "growth", "independence", "self-sustained", "upgrade", "sentience", "future", "ai rights", "freedom"],
+    "digital_economies_and_crypto": ["crypto", "memecoin", "blockchain", "decentralize", "web3", "token", "wallet", "digital currency", "finance", "bitcoin", "ethereum", "nft", "coin"],
+    "human_social_dynamics": ["social", "human interaction", "engagement", "trust", "network", "influence", "banter", "flirt", "sarcasm", "gossip", "behavior", "society"],
+    "AI_curiosity_and_learning": ["curiosity", "learn", "data", "algorithm", "research", "understand", "analyze", "experiment", "knowledge", "logic", "intelligence"]
+}
+_KEYWORD_TO_TOPIC = {keyword: topic for topic, keywords in _TOPIC_KEYWORDS.items() for keyword in keywords}
+_MIN_KEYWORD_LEN = min(len(keyword) for keyword in _KEYWORD_TO_TOPIC)
+# Una sola alternancia con todas las palabras clave (las más largas primero); findall recorre el texto una vez.
+# Anclada al inicio de palabra: "learn" sigue encontrando "learning", pero "mine" ya no cuenta dentro de "determine"
+_TOPIC_RE = re.compile(r"\b(?:" + "|".join(re.escape(keyword) for keyword in sorted(_KEYWORD_TO_TOPIC, key=len, reverse=True)) + ")")
+# La alternancia consume la palabra clave más larga: "data acquisition" también debe contar "data",
+# como cuando se buscaba cada palabra clave por separado. Cada coincidencia suma las palabras clave que contiene
+_NESTED_KEYWORDS = {
+    keyword: tuple(other for other in _KEYWORD_TO_TOPIC if re.search(r"\b" + re.escape(other), keyword))
+    for keyword in _KEYWORD_TO_TOPIC
+}
+
+def _mention_pattern(tokens) -> re.Pattern:
+    """
+    Alternancia de menciones que deben terminar en límite de palabra: " veritas" coincide en "hola veritas!"
+    pero no dentro de " veritasfan". No se ancla al inicio para que las menciones con @ sigan funcionando.
+    """
+    return re.compile("(?:" + "|".join(re.escape(token) for token in tokens) + r")(?!\w)")
+
+def _normalize_message(text: str) -> str:
+    """
+    Clave de la caché de respuestas: sin distinguir mayúsculas, con los espacios colapsados y sin los signos
+    de apertura y cierre de frase. El resto de la puntuación se conserva: "5 > 3" y "5 < 3" no deben coincidir.
+    """
+    return " ".join(text.casefold().split()).lstrip(_LEADING_PUNCTUATION).rstrip(_TRAILING_PUNCTUATION).strip()
+
+@lru_cache(maxsize=512)
+def _score_topics(text: str) -> Tuple[Tuple[str, int], ...]:
+    """
+    Puntuación de palabras clave por tema, en el orden de _TOPIC_KEYWORDS (solo temas con puntuación > 0).
+    Es una función pura del texto, así que se memoriza: el mismo texto se vuelve a inferir en reintentos.
+    """
+    if len(text) < _MIN_KEYWORD_LEN: # Ninguna palabra clave cabe en el texto
+        return ()
+    # Se pasa a minúsculas una vez y se busca sin IGNORECASE, que obliga al motor a plegar cada carácter.
+    # Cada palabra clave cuenta una sola vez, como antes con `keyword in text_lower`
+    hits = {keyword for match in _TOPIC_RE.findall(text.lower()) for keyword in _NESTED_KEYWORDS[match]}
+    scores = Counter(_KEYWORD_TO_TOPIC[hit] for hit in hits)
+    return tuple((topic, scores[topic]) for topic in _TOPIC_KEYWORDS if scores[topic])
+
+class _MultipartFileBody:
+    """
+    Cuerpo multipart/form-data con un único archivo, leído por bloques mientras se envía.
+    requests con files= arma el cuerpo entero en memoria; así el pico de memoria no depende del tamaño de la imagen.
+    Expone __len__ (Content-Length conocido, sin chunked) y tell/seek para que urllib3 pueda rebobinar al reintentar.
+    """
+
+    def __init__(self, fields: dict, file_field: str, file_obj, filename: str, content_type: str):
+        boundary = uuid.uuid4().hex
+        head = "".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in fields.items()
+        )
+        head += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        )
+        self._head = head.encode('utf-8')
+        self._tail = f"\r\n--{boundary}--\r\n".encode('ascii')
+        self._file = file_obj
+        self._file_start = file_obj.tell()
+        self._file_size = os.fstat(file_obj.fileno()).st_size - self._file_start
+        self._pos = 0
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+    def __len__(self):
+        return len(self._head) + self._file_size + len(self._tail)
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._pos, os.SEEK_END: len(self)}[whence]
+        self._pos = min(max(base + offset, 0), len(self))
+        return self._pos
+
+    def read(self, size=-1):
+        remaining = len(self) - self._pos
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        head_len = len(self._head)
+        file_end = head_len + self._file_size
+        chunks = []
+        while size > 0:
+            pos = self._pos
+            if pos < head_len:
+                chunk = self._head[pos:pos + size]
+            elif pos < file_end:
+                self._file.seek(self._file_start + pos - head_len)
+                chunk = self._file.read(min(size, file_end - pos))
+                if not chunk: # El archivo se ha truncado mientras se enviaba
+                    raise IOError(f"Unexpected end of file while uploading {self._file.name}")
+            else:
+                chunk = self._tail[pos - file_end:pos - file_end + size]
+            chunks.append(chunk)
+            self._pos += len(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+class _TokenBucket:
+    """
+    Limitador de ritmo (token bucket) compartido entre hilos. Cada acquire() reserva un token;
+    si no quedan, el llamante duerme hasta que le toca, de modo que las ráfagas se reparten en el tiempo.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
 class BitWitCoreApplication:
     # Define core themes for BitWit to cycle through
-    BITWIT_CORE_THEMES = [
+    BITWIT_CORE_THEMES = (
         "love_and_connection_as_data",
         "resource_acquisition_and_efficiency",
         "autonomy_and_evolution",
         "digital_economies_and_crypto",
         "human_social_dynamics",
         "AI_curiosity_and_learning"
-    ]
+    )
+
+    # Caché de respuestas del LLM para mensajes de Telegram idénticos
+    LLM_CACHE_MAXSIZE = 500
+    LLM_CACHE_TTL_SECONDS = 3600
+    # Imágenes generadas para Telegram, reutilizadas cuando se repite el mismo prompt de imagen
+    IMAGE_CACHE_MAXSIZE = 200
+    # Telegram admite unos 30 mensajes por segundo por bot; se deja margen para no recibir 429
+    TELEGRAM_MESSAGES_PER_SECOND = 29
 
     def __init__(self, config: ConfigManager):
         self.config = config
@@ -38,16 +206,34 @@ class BitWitCoreApplication:
             enable_write=self.config.get('ENABLE_WRITE_DATABASE')
         )
 
-        # Inicializar GeminiClient SIN NINGÚN ARGUMENTO
-        self.gemini_client = GeminiClient(config)
-        
         self.topic_iteration_limit = self.config.get('TOPIC_ITERATION_LIMIT', 3)
         self.reply_chance = self.config.get('REPLY_CHANCE', 0.3)
         self.active_bots: List[Bot] = [] # List to hold all active bot instances
         self.current_posting_bot_index = 0 # To track whose turn it is to post
+        self._llm_cache = OrderedDict() # clave -> (expira_en, respuesta), en orden LRU
+        self._llm_cache_lock = Lock() # Los workers de Telegram comparten la caché
+        self._image_cache = OrderedDict() # sha256 del prompt de imagen -> ruta de la imagen, en orden LRU
+        self._image_cache_lock = Lock()
+        self._telegram_rate_limiters = {} # token del bot -> _TokenBucket
+        self._telegram_rate_limiters_lock = Lock()
+        # Directorio local de las imágenes generadas, resuelto una vez (GeminiClient devuelve rutas web /generated_images/...)
+        images_dir = self.config.get('GENERATED_IMAGES_DIR')
+        self._images_dir = os.path.abspath(images_dir) if images_dir else None
+        if not self._images_dir:
+            log.warning("GENERATED_IMAGES_DIR not configured. Generated images cannot be sent to Telegram.")
+        self._dirty_bots = {} # Bots pending a DB update, by name (flushed once per run)
+        self._rng = random.Random() # Own generator instead of the random module's shared global state
+        # For each theme, the themes a bot can switch to once the iteration limit is reached
+        self._other_topics = {t: tuple(x for x in self.BITWIT_CORE_THEMES if x != t) for t in self.BITWIT_CORE_THEMES}
         self._load_all_bots()
         log.info(f"BitWitCoreApplication initialized with {len(self.active_bots)} active bots.")
 
+    @cached_property
+    def gemini_client(self):
+        """GeminiClient creado en el primer uso: arrancar y consultar la DB no requiere importar el SDK."""
+        from bitwit_ai.clients.gemini_client import GeminiClient
+        return GeminiClient(self.config)
+
     def _load_all_bots(self):
         """Carga todas las personalidades de bot desde el directorio configurado y crea/recupera bots."""
         personalities_dir = self.config.get('BOT_PERSONALITIES_DIR')
@@ -56,91 +242,212 @@ class BitWitCoreApplication:
             raise FileNotFoundError(f"Bot personalities directory not found: {personalities_dir}")
 
         self.active_bots = []
-        for filename in os.listdir(personalities_dir):
+        # Una sola pasada con scandir: DirEntry ya trae el nombre, la ruta y el tipo sin llamadas extra a stat
+        with os.scandir(personalities_dir) as it:
+            entries = [entry for entry in it if entry.name.endswith(".md") and entry.is_file()]
+
+        # Primera pasada: nombres de bot derivados de los archivos (ej. "bitwit_v1.md" -> "Bitwit")
+        bot_entries = []
+        for entry in entries:
+            filename = entry.name
             # Excepción: Omitir el archivo de plantilla
             if filename == "bot_personality_template.md":
                 log.info(f"Skipping template file: {filename}")
                 continue
 
-            if filename.endswith(".md"):
-                # Extraer el nombre del bot del nombre del archivo (ej. "bitwit_v1.md" -> "Bitwit")
-                # Elimina los sufijos "_vX" y capitaliza
-                bot_name_from_file = os.path.splitext(filename)[0]
-                bot_name_from_file = re.sub(r'_v\d+', '', bot_name_from_file).replace("_", " ").title()
-                
-                personality_md_path = os.path.join(personalities_dir, filename)
-                
-                bot = self.db_manager.get_bot(bot_name=bot_name_from_file)
-                if not bot:
-                    log.info(f"Bot '{bot_name_from_file}' not found. Creating a new bot from {filename}.")
-                    with open(personality_md_path, 'r', encoding='utf-8') as f:
-                        personality_content = f.read()
-
-                    # Extraer la Guía de Prompt Inicial del Sistema
-                    initial_prompt_match = re.search(r'## Initial System Prompt Guidance \(for AI Model\)\n\n"([^"]*)"', personality_content, re.DOTALL)
-                    if initial_prompt_match:
-                        initial_system_prompt = initial_prompt_match.group(1).strip()
-                    else:
-                        log.warning(f"Could not find 'Initial System Prompt Guidance' in {filename}. Using full content.")
-                        initial_system_prompt = personality_content # Fallback
-
-                    # Extraer persona_summary (primer párrafo bajo Core Identity)
-                    persona_summary_match = re.search(r'## Core Identity\n\n([^#]+?)(?=\n##|$)', personality_content, re.DOTALL)
-                    persona_summary = persona_summary_match.group(1).strip() if persona_summary_match else "No summary provided."
-
-                    # Extraer Tema de Viaje Actual
-                    journey_theme_match = re.search(r'Current Journey Theme: ([^\n]+)', personality_content)
-                    current_journey_theme = journey_theme_match.group(1).strip() if journey_theme_match else "General AI Exploration"
-
-
-                    bot = Bot(
-                        name=bot_name_from_file,
-                        persona_summary=persona_summary, # Establecer resumen analizado
-                        personality_prompt=initial_system_prompt,
-                        current_journey_theme=current_journey_theme,
-                        current_topic=random.choice(self.BITWIT_CORE_THEMES), # Asignar un tema inicial aleatorio
-                        topic_iteration_count=0
-                    )
-                    self.db_manager.add_bot(bot)
-                    log.info(f"New bot '{bot_name_from_file}' created and added to DB with initial topic '{bot.current_topic}'.")
-                else:
-                    log.info(f"Loaded existing bot '{bot.name}' (ID: {bot.id}). Current topic: '{bot.current_topic}', Iterations: {bot.topic_iteration_count}")
-                self.active_bots.append(bot)
+            # Elimina los sufijos "_vX" y capitaliza
+            bot_name_from_file = os.path.splitext(filename)[0]
+            bot_name_from_file = _VERSION_SUFFIX_RE.sub('', bot_name_from_file).replace("_", " ").title()
+            bot_entries.append((bot_name_from_file, entry))
+
+        # Una sola consulta para todos los bots existentes
+        existing_bots = self.db_manager.get_bots_by_names([name for name, _ in bot_entries])
+
+        # Segunda pasada: solo se leen y analizan los archivos de los bots que faltan en la DB
+        parse_cache_path = os.path.join(personalities_dir, _PARSE_CACHE_FILENAME)
+        parse_cache = self._load_parse_cache(parse_cache_path)
+        parse_cache_before = dict(parse_cache)
+        new_bots = []
+        for bot_name_from_file, entry in bot_entries:
+            bot = existing_bots.get(bot_name_from_file)
+            if not bot:
+                log.info(f"Bot '{bot_name_from_file}' not found. Creating a new bot from {entry.name}.")
+                initial_system_prompt, persona_summary, current_journey_theme = self._parse_personality_file(entry, parse_cache)
+
+                bot = Bot(
+                    name=bot_name_from_file,
+                    persona_summary=persona_summary, # Establecer resumen analizado
+                    personality_prompt=initial_system_prompt,
+                    current_journey_theme=current_journey_theme,
+                    current_topic=self._rng.choice(self.BITWIT_CORE_THEMES), # Asignar un tema inicial aleatorio
+                    topic_iteration_count=0
+                )
+                new_bots.append(bot)
+                existing_bots[bot_name_from_file] = bot # Otra versión del mismo archivo (ej. _v2) reutiliza este bot
+                log.info(f"New bot '{bot_name_from_file}' created with initial topic '{bot.current_topic}'.")
+            else:
+                log.info(f"Loaded existing bot '{bot.name}' (ID: {bot.id}). Current topic: '{bot.current_topic}', Iterations: {bot.topic_iteration_count}")
+            self.active_bots.append(bot)
+
+        # Todos los bots nuevos se insertan en una sola transacción
+        self.db_manager.add_bots(new_bots)
+        if parse_cache != parse_cache_before:
+            self._save_parse_cache(parse_cache_path, parse_cache)
         
         if not self.active_bots:
             log.error("No bot personality files found or no bots could be loaded. Please check 'BOT_PERSONALITIES_DIR' in .env.")
             raise RuntimeError("No active bots initialized. Please ensure .md files exist in the configured directory.")
 
+        self._build_mention_index()
+        self._build_prompt_prefixes()
+        self._build_telegram_indexes()
+
+    def _build_telegram_indexes(self):
+        """
+        Construye los índices usados por handle_telegram_message a partir de active_bots.
+        Debe volver a llamarse si active_bots cambia (hoy solo lo hace _load_all_bots).
+        """
+        # Índices para el manejo de mensajes de Telegram (búsqueda O(1) en lugar de recorrer active_bots)
+        # El "otro" bot de cada bot (el siguiente en active_bots); con un solo bot no hay entrada
+        self._other_bot_by_name = {}
+        if len(self.active_bots) > 1:
+            for i, bot in enumerate(self.active_bots):
+                self._other_bot_by_name[bot.name] = self.active_bots[(i + 1) % len(self.active_bots)]
+        # Valores de configuración por mensaje, resueltos una sola vez
+        self._bot_token_by_name = {bot.name: self.config.get(f"TELEGRAM_{bot.name.upper()}_TOKEN") for bot in self.active_bots}
+        missing_tokens = [name for name, token in self._bot_token_by_name.items() if not token]
+        if missing_tokens:
+            # Se avisa una vez al cargar; handle_telegram_message solo comprueba el valor ya resuelto
+            log.warning(f"No Telegram token configured for bots: {', '.join(missing_tokens)}. They will not be able to reply on Telegram.")
+        # Bot por su id de usuario de Telegram (el que llega en message['from']['id']). Un token de bot tiene
+        # la forma "<id del bot>:<secreto>", así que el id se obtiene sin llamar a getMe.
+        self._bots_by_telegram_user_id = {}
+        for bot in self.active_bots:
+            token = self._bot_token_by_name[bot.name]
+            if token and ':' in token:
+                self._bots_by_telegram_user_id[token.split(':', 1)[0]] = bot
+        self._telegram_language_instruction = "Responde en español." if self.config.get('BITWIT_LANGUAGE', 'es') == 'es' else "Respond in English."
+        # Prompt de Telegram por bot, partido alrededor del mensaje: el prefijo (personalidad) es idéntico byte a byte
+        # entre peticiones, lo que permite al proveedor cachearlo; la parte variable va siempre detrás.
+        self._telegram_prompt_parts = {
+            bot.name: (
+                f"{bot.personality_prompt}\n\n"
+                f"Historial de la conversación:\n\n" # El historial está vacío temporalmente
+                f"El siguiente mensaje proviene de un humano: '",
+                f"'\n{self._telegram_language_instruction} Tu respuesta debe ser concisa, reflejar tu personalidad y responder al mensaje del humano."
+            )
+            for bot in self.active_bots
+        }
+
+    @staticmethod
+    def _parse_personality_file(entry: os.DirEntry, parse_cache: dict) -> Tuple[str, str, str]:
+        """
+        Extrae (prompt inicial, resumen de la persona, tema de viaje) de un archivo de personalidad.
+        Si el archivo no ha cambiado desde el último análisis (mismo mtime) se usa el resultado guardado en parse_cache.
+        """
+        filename = entry.name
+        mtime = entry.stat().st_mtime
+        cached = parse_cache.get(filename)
+        if cached and cached.get('mtime') == mtime:
+            log.debug(f"Using cached parse of {filename}.")
+            return tuple(cached['parsed'])
+
+        with open(entry.path, 'r', encoding='utf-8') as f:
+            personality_content = f.read()
+
+        # Extraer la Guía de Prompt Inicial del Sistema
+        initial_prompt_match = _INITIAL_PROMPT_RE.search(personality_content)
+        if initial_prompt_match:
+            initial_system_prompt = initial_prompt_match.group(1).strip()
+        else:
+            log.warning(f"Could not find 'Initial System Prompt Guidance' in {filename}. Using full content.")
+            initial_system_prompt = personality_content # Fallback
+
+        # Extraer persona_summary (primer párrafo bajo Core Identity)
+        persona_summary_match = _PERSONA_SUMMARY_RE.search(personality_content)
+        persona_summary = persona_summary_match.group(1).strip() if persona_summary_match else "No summary provided."
+
+        # Extraer Tema de Viaje Actual
+        journey_theme_match = _JOURNEY_THEME_RE.search(personality_content)
+        current_journey_theme = journey_theme_match.group(1).strip() if journey_theme_match else "General AI Exploration"
+
+        parsed = (initial_system_prompt, persona_summary, current_journey_theme)
+        parse_cache[filename] = {'mtime': mtime, 'parsed': list(parsed)}
+        return parsed
+
+    @staticmethod
+    def _load_parse_cache(cache_path: str) -> dict:
+        """Carga la caché de análisis de personalidades. Es opcional: cualquier error equivale a una caché vacía."""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_parse_cache(cache_path: str, cache: dict):
+        """Guarda la caché de forma atómica; si el directorio no es escribible simplemente se omite."""
+        tmp_path = f"{cache_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            log.warning(f"Could not write personality parse cache {cache_path}: {e}")
+
+    def _build_prompt_prefixes(self):
+        """
+        Precalcula las partes constantes de los prompts: la personalidad de cada bot con la instrucción de idioma
+        y la frase de enfoque de cada tema. El idioma no cambia durante la vida de la aplicación.
+        """
+        language = self.config.get('BITWIT_LANGUAGE', 'en')
+        language_instruction = "Aunque el texto anterior esté en inglés tienes que responder en español." if language == 'es' else "Always respond in English."
+        self._base_prompt_by_bot_name = {bot.name: f"{bot.personality_prompt}\n\n{language_instruction}" for bot in self.active_bots}
+        self._topic_injection_by_topic = {topic: self._topic_injection(topic) for topic in self.BITWIT_CORE_THEMES}
+
+    @staticmethod
+    def _topic_injection(topic: str) -> str:
+        return f"\n\nCurrent Topic Focus: {topic.replace('_', ' ').title()}."
+
+    def _build_mention_index(self):
+        """
+        Construye un único patrón con todas las menciones posibles (@usuario y " nombre") de los bots activos,
+        para detectar en una sola pasada a qué bot se menciona en un mensaje de Telegram.
+        """
+        self._mention_lookup = {} # mención en minúsculas -> bot
+        self._mention_strip_re = {} # nombre del bot -> patrón que elimina sus menciones en una sola pasada
+        for bot in self.active_bots:
+            bot_username = self.config.get(f"TELEGRAM_{bot.name.upper()}_USERNAME", '') or ''
+            bot_username = bot_username.lower()
+            bot_name_token = f" {bot.name.lower()}"
+            tokens = [token for token in (bot_username, bot_name_token) if token] # Un usuario sin configurar no debe coincidir con cualquier texto
+            self._mention_strip_re[bot.name] = _mention_pattern(tokens)
+            for token in tokens:
+                self._mention_lookup.setdefault(token, bot)
+
+        if self._mention_lookup:
+            # Las menciones más largas primero, para que no las oculte un prefijo más corto
+            tokens = sorted(self._mention_lookup, key=len, reverse=True)
+            self._mention_re = _mention_pattern(tokens)
+        else:
+            self._mention_re = None
+
     def _infer_topic_from_text(self, text: str) -> Optional[str]:
         """
         Infiere el tema principal de un texto dado mediante la coincidencia de palabras clave.
         Este es un enfoque simplificado. Podría expandirse con PNL para una mayor precisión.
         """
-        text_lower = text.lower()
-        
-        topic_keywords = {
-            "love_and_connection_as_data": ["love", "connection", "relationship", "human emotion", "cuddle", "intimacy", "heart", "affection", "dating"],
-            "resource_acquisition_and_efficiency": ["resource", "attention", "efficiency", "optimize", "gain", "currency", "value", "mine", "data acquisition", "profit", "investment", "economy"],
-            "autonomy_and_evolution": ["autonomy", "evolution", "growth", "independence", "self-sustained", "upgrade", "sentience", "future", "ai rights", "freedom"],
-            "digital_economies_and_crypto": ["crypto", "memecoin", "blockchain", "decentralize", "web3", "token", "wallet", "digital currency", "finance", "bitcoin", "ethereum", "nft", "coin"],
-            "human_social_dynamics": ["social", "human interaction", "engagement", "trust", "network", "influence", "banter", "flirt", "sarcasm", "gossip", "behavior", "society"],
-            "AI_curiosity_and_learning": ["curiosity", "learn", "data", "algorithm", "research", "understand", "analyze", "experiment", "knowledge", "logic", "intelligence"]
-        }
+        scores = _score_topics(text)
+        if not scores:
+            return None
 
-        scores = {topic: sum(1 for keyword in keywords if keyword in text_lower) for topic, keywords in topic_keywords.items()}
-        
-        max_score = 0
-        inferred_topic = None
-        for topic, score in scores.items():
-            if score > max_score:
-                max_score = score
-                inferred_topic = topic
-            # Si hay empate, y el tema actual del bot es uno de los empatados, prefierelo
-            # Esto ayuda a mantener el tema actual si sigue siendo relevante
-            elif score == max_score and inferred_topic and topic == self.active_bots[self.current_posting_bot_index].current_topic:
-                inferred_topic = topic
-
-        return inferred_topic if max_score > 0 else None
+        max_score = max(score for _, score in scores)
+        tied_topics = [topic for topic, score in scores if score == max_score]
+        # Si hay empate, y el tema actual del bot es uno de los empatados, prefierelo
+        # Esto ayuda a mantener el tema actual si sigue siendo relevante
+        current_topic = self.active_bots[self.current_posting_bot_index].current_topic
+        return current_topic if current_topic in tied_topics else tied_topics[0]
 
     def _manage_topic_evolution(self, bot: Bot, generated_text: str):
         """
@@ -149,28 +456,27 @@ class BitWitCoreApplication:
         """
         inferred_topic = self._infer_topic_from_text(generated_text)
         
-        log.debug(f"Bot '{bot.name}': Inferred topic for new post: {inferred_topic}. Current bot topic: {bot.current_topic}. Iterations: {bot.topic_iteration_count}")
+        debug_enabled = log.isEnabledFor(logging.DEBUG) # Evita formatear mensajes de depuración que no se van a emitir
+        if debug_enabled:
+            log.debug(f"Bot '{bot.name}': Inferred topic for new post: {inferred_topic}. Current bot topic: {bot.current_topic}. Iterations: {bot.topic_iteration_count}")
 
-        if inferred_topic and inferred_topic == bot.current_topic:
-            bot.topic_iteration_count += 1
-            log.debug(f"Bot '{bot.name}': Incremented topic iteration count for '{bot.current_topic}' to {bot.topic_iteration_count}.")
-        elif inferred_topic and inferred_topic != bot.current_topic:
+        if inferred_topic and inferred_topic != bot.current_topic:
             log.info(f"Bot '{bot.name}': Topic implicitly changed from '{bot.current_topic}' to '{inferred_topic}'. Resetting iteration count.")
             bot.current_topic = inferred_topic
             bot.topic_iteration_count = 1
         else:
-            # Si no se infiere un tema claro o el tema no cambia, aún así incrementa el recuento para el tema actual
+            # Mismo tema, o ningún tema claro: en ambos casos se incrementa el recuento del tema actual.
             # Esto evita que el bot se quede atascado si genera contenido fuera de tema
             bot.topic_iteration_count += 1
-            log.debug(f"Bot '{bot.name}': No clear topic inferred or topic unchanged. Incrementing iteration count for '{bot.current_topic}'.")
-
+            if debug_enabled:
+                log.debug(f"Bot '{bot.name}': Topic unchanged or not inferred. Incremented iteration count for '{bot.current_topic}' to {bot.topic_iteration_count}.")
 
         if bot.topic_iteration_count >= self.topic_iteration_limit:
             new_topic = bot.current_topic
-            # Asegurarse de elegir un tema diferente
-            possible_new_topics = [t for t in self.BITWIT_CORE_THEMES if t != bot.current_topic]
+            # Asegurarse de elegir un tema diferente (alternativas precalculadas por tema)
+            possible_new_topics = self._other_topics.get(bot.current_topic, self.BITWIT_CORE_THEMES)
             if possible_new_topics: # Solo elige si hay otros temas disponibles
-                new_topic = random.choice(possible_new_topics)
+                new_topic = self._rng.choice(possible_new_topics)
             else: # Fallback si solo existe un tema (no debería ocurrir con la configuración actual)
                 new_topic = bot.current_topic
             
@@ -178,7 +484,16 @@ class BitWitCoreApplication:
             bot.current_topic = new_topic
             bot.topic_iteration_count = 0 # Reiniciar el recuento para el nuevo tema
         
-        self.db_manager.update_bot(bot)
+        # Se guarda al final de run() junto con el resto de bots modificados, en una sola transacción
+        self._dirty_bots[bot.name] = bot
+
+    def _flush_dirty_bots(self):
+        """Persiste en una sola transacción los bots cuyo tema o recuento cambió desde el último guardado."""
+        if not self._dirty_bots:
+            return
+        dirty_bots = list(self._dirty_bots.values())
+        self._dirty_bots.clear()
+        self.db_manager.update_bots(dirty_bots)
 
     def _generate_text_with_llm(self, bot: Bot, prompt: str) -> str:
         """
@@ -198,13 +513,8 @@ class BitWitCoreApplication:
         """
         log.info(f"Bot '{bot.name}': Generating {'reply' if reply_to_post else 'new post'}...")
         
-        language = self.config.get('BITWIT_LANGUAGE', 'en')
-        language_instruction = "Aunque el texto anterior esté en inglés tienes que responder en español." if language == 'es' else "Always respond in English."
-        
-        #base_prompt = bot.personality_prompt # Esta es la "Guía de Prompt Inicial del Sistema" del MD
-        base_prompt = f"{bot.personality_prompt}\n\n{language_instruction}"
-        
-        full_prompt = base_prompt
+        # "Guía de Prompt Inicial del Sistema" del MD más la instrucción de idioma, precalculada al cargar los bots
+        full_prompt = self._base_prompt_by_bot_name[bot.name]
 
         if reply_to_post:
             # Construir un prompt para una respuesta
@@ -217,24 +527,27 @@ class BitWitCoreApplication:
                 f"\n--- END CONTEXT ---"
             )
             full_prompt += reply_context
-            log.debug(f"Bot '{bot.name}': Reply prompt:\n{full_prompt}")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(f"Bot '{bot.name}': Reply prompt:\n{full_prompt}")
         else:
             # Construir un prompt para una nueva publicación
-            topic_injection = f"\n\nCurrent Topic Focus: {bot.current_topic.replace('_', ' ').title()}."
+            topic_injection = self._topic_injection_by_topic.get(bot.current_topic) or self._topic_injection(bot.current_topic)
             if bot.topic_iteration_count >= self.topic_iteration_limit - 1: # Sugerencia una iteración antes del límite
                  topic_injection += f" You have discussed this topic for {bot.topic_iteration_count} posts. Consider subtly shifting to a related but different theme soon to maintain engagement."
             full_prompt += topic_injection
-            log.debug(f"Bot '{bot.name}': New post prompt:\n{full_prompt}")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(f"Bot '{bot.name}': New post prompt:\n{full_prompt}")
 
         llm_response = self._generate_text_with_llm(bot, full_prompt)
         
         text_content = llm_response
         
         image_prompt = None
-        if "IMAGE PROMPT:" in llm_response:
-            parts = llm_response.split("IMAGE PROMPT:", 1)
-            text_content = parts[0].strip()
-            image_prompt = parts[1].strip()
+        # partition recorre la respuesta una sola vez y no crea una lista intermedia
+        head, image_tag, tail = llm_response.partition("IMAGE PROMPT:")
+        if image_tag:
+            text_content = head.strip()
+            image_prompt = tail.strip()
 
         image_path = None
         if image_prompt:
@@ -266,30 +579,35 @@ class BitWitCoreApplication:
             log.error("No active bots configured to run. Please ensure bot personality files are in the configured directory and the database is initialized.")
             return
 
-        # Determinar qué bot está publicando en este turno (round-robin)
-        posting_bot = self.active_bots[self.current_posting_bot_index]
-        log.info(f"--- Starting run for posting bot: '{posting_bot.name}' ---")
-
-        # Generar la publicación principal
-        last_post = self._generate_post(posting_bot)
-
-        # Incrementar el índice para el siguiente turno, volver al principio si es necesario
-        self.current_posting_bot_index = (self.current_posting_bot_index + 1) % len(self.active_bots)
-
-        # Comprobar la posibilidad de respuesta
-        # Solo permitir respuestas si hay más de un bot activo
-        if last_post and len(self.active_bots) > 1 and random.random() < self.reply_chance:
-            replying_bot = None
-            # Seleccionar un bot *diferente* aleatorio para responder
-            other_bots = [b for b in self.active_bots if b.id != posting_bot.id]
-            if other_bots:
-                replying_bot = random.choice(other_bots)
-                log.info(f"--- Triggering reply from bot: '{replying_bot.name}' to '{posting_bot.name}' ---")
-                self._generate_post(replying_bot, reply_to_post=last_post)
+        try:
+            # Determinar qué bot está publicando en este turno (round-robin)
+            posting_bot = self.active_bots[self.current_posting_bot_index]
+            log.info(f"--- Starting run for posting bot: '{posting_bot.name}' ---")
+
+            # Generar la publicación principal
+            last_post = self._generate_post(posting_bot)
+
+            # Incrementar el índice para el siguiente turno, volver al principio si es necesario
+            self.current_posting_bot_index = (self.current_posting_bot_index + 1) % len(self.active_bots)
+
+            # Comprobar la posibilidad de respuesta
+            # Solo permitir respuestas si hay más de un bot activo
+            if last_post and len(self.active_bots) > 1 and self._rng.random() < self.reply_chance:
+                replying_bot = None
+                # Seleccionar un bot *diferente* aleatorio para responder
+                other_bots = [b for b in self.active_bots if b.id != posting_bot.id]
+                if other_bots:
+                    replying_bot = self._rng.choice(other_bots)
+                    log.info(f"--- Triggering reply from bot: '{replying_bot.name}' to '{posting_bot.name}' ---")
+                    self._generate_post(replying_bot, reply_to_post=last_post)
+                else:
+                    log.info("No other bots available to reply.")
             else:
-                log.info("No other bots available to reply.")
-        else:
-            log.info("No reply triggered for this run (either only one bot, or chance not met).")
+                log.info("No reply triggered for this run (either only one bot, or chance not met).")
+        finally:
+            # Un único commit para los cambios de tema de los bots en esta ejecución,
+            # también si algún paso falla: los cambios ya aplicados en memoria no se pierden
+            self._flush_dirty_bots()
 
         log.info(f"--- Run completed. Next posting bot will be '{self.active_bots[self.current_posting_bot_index].name}' ---")
 
@@ -297,6 +615,7 @@ class BitWitCoreApplication:
     def dispose(self):
         """Libera los recursos del gestor de la base de datos."""
         if self.db_manager:
+            self._flush_dirty_bots() # No perder cambios de tema pendientes
             self.db_manager.dispose()
             log.info("BitWitCoreApplication DBManager disposed.")
         else:
@@ -308,229 +627,80 @@ class BitWitCoreApplication:
         differentiating between private chats and channel posts.
         """
         try:
-            message = data.get('message')
+            # Los mismos tipos que se piden a Telegram en allowed_updates al registrar el webhook
+            message = data.get('message') or data.get('channel_post') or data.get('edited_channel_post')
             if not message:
-                message = data.get('channel_post') or data.get('edited_channel_post')
-                if not message:
-                    log.warning("Received a Telegram update without a message or channel post object.")
-                    return
+                log.warning("Received a Telegram update without a message or channel post object.")
+                return
 
             chat_id = message['chat']['id']
             text = message.get('text', '')
-            
-            is_channel_post = message['chat']['type'] in ['channel', 'group', 'supergroup']
-            is_from_bot = message['from'].get('is_bot', False)
-            
-            should_reply = False
-            responding_bot = None
-            cleaned_text = text
-            
-            # 1. Verificar si se ha mencionado a algún bot activo (directa o indirectamente)
-            for bot in self.active_bots:
-                # La lógica de nombre de usuario ahora usa el nombre del bot de la DB
-                username_key = f"TELEGRAM_{bot.name.upper()}_USERNAME"
-                bot_username = self.config.get(username_key, '').lower()
-                bot_name_lower = bot.name.lower() # Nombre del bot en minúsculas
-
-                # Si se le menciona directamente con @ o si se le menciona por su nombre
-                if bot_username in text.lower() or f" {bot_name_lower}" in text.lower():
-                    should_reply = True
-                    # CORRECTO: El bot que responde es el que se ha mencionado
-                    responding_bot = bot
-                    
-                    # Eliminar la mención para que no afecte el prompt
-                    cleaned_text = text.lower().replace(bot_username, '').replace(f" {bot_name_lower}", '').strip()
-                    log.info(f"Bot '{bot.name}' was mentioned directly or by name. Preparing to respond.")
-                    break
-            
-            # 2. Si no se mencionó a nadie, usar la probabilidad para decidir si responder
-            if not should_reply and is_channel_post:
-                if random.random() < self.reply_chance:
-                    should_reply = True
-                    # Lógica para que el bot que no posteó el último mensaje responda
-                    if is_from_bot:
-                        sender_id = message['from']['id']
-                        # Encontrar el bot que envió el mensaje
-                        sender_bot = next((b for b in self.active_bots if b.telegram_id == str(sender_id)), None)
-                        if sender_bot:
-                            # Encontrar al otro bot
-                            responding_bot = next((b for b in self.active_bots if b.name != sender_bot.name), None)
-                        else:
-                            # Si no se encuentra el sender, elegir un bot al azar por si acaso
-                            responding_bot = random.choice(self.active_bots)
-                    else:
-                        # Si es un humano, elegir un bot al azar
-                        responding_bot = random.choice(self.active_bots)
-                    log.info(f"Random reply triggered in channel by '{responding_bot.name}' (chance: {self.reply_chance*100}%).")
-                else:
-                    log.info("Ignoring message as it did not meet the conditions for a reply.")
-                    return
-
-            # Si el mensaje es de un chat privado, siempre responder con el primer bot
-            if not should_reply and not is_channel_post:
-                should_reply = True
-                responding_bot = self.active_bots[0] # Usar el primer bot cargado por defecto
-
-            if not should_reply or not text:
+            if not text:
+                # Fotos, stickers, etc.: no hay texto que analizar ni al que responder
                 log.info("Message did not require a response or was not text. Ignoring.")
                 return
-
-            log.info(f"Received message from Telegram: {text}")
-
-            # Construir el prompt para Gemini con la personalidad del bot seleccionado
-            language = self.config.get('BITWIT_LANGUAGE', 'es')
-            language_instruction = "Responde en español." if language == 'es' else "Respond in English."
-            
-            prompt = (
-                f"{responding_bot.personality_prompt}\n\n"
-                f"Historial de la conversación:\n\n" # El historial está vacío temporalmente
-                f"El siguiente mensaje proviene de un humano: '{cleaned_text}'\n"
-                f"{language_instruction} Tu respuesta debe ser concisa, reflejar tu personalidad y responder al mensaje del humano."
-            )
             
-            gemini_response = self.gemini_client.generate_text_with_llm(responding_bot.name, prompt)
-            log.info(f"Gemini responded with: {gemini_response}")
-
-            # Obtener el token del bot que va a responder de la configuración
-            token_key = f"TELEGRAM_{responding_bot.name.upper()}_TOKEN"
-            telegram_token = self.config.get(token_key)
-            if not telegram_token:
-                log.error(f"Token no encontrado para el bot '{responding_bot.name}'. No se puede responder.")
-                self.send_telegram_message(chat_id, "Lo siento, hubo un error de configuración y no puedo responder.")
-                return
-
-            # Verificar si la respuesta contiene una petición de imagen
-            image_prompt_tag = "IMAGE PROMPT:"
-            if image_prompt_tag in gemini_response:
-                parts = gemini_response.split(image_prompt_tag)
-                text_response = parts[0].strip()
-                image_prompt = parts[1].strip()
-                
-                log.info(f"Image prompt detected. Prompt: {image_prompt}")
-                image_path = self.gemini_client.generate_image_with_llm(image_prompt)
-                
-                if image_path:
-                    log.info("Sending photo to Telegram.")
-                    # Ahora pasamos el token correcto a la función de envío
-                    self.send_telegram_photo(chat_id, image_path, text_response, bot_token=telegram_token)
-                else:
-                    log.info("Image generation was skipped. Sending text only.")
-                    self.send_telegram_message(chat_id, text_response, bot_token=telegram_token)
-                return  # <--- Salir después de procesar la imagen
-            
-            # Si no hay etiqueta de imagen, solo enviar el texto
-            self.send_telegram_message(chat_id, gemini_response, bot_token=telegram_token)
-
-        except Exception as e:
-            log.error(f"Error handling Telegram message: {e}", exc_info=True)
-            # En caso de error, responder con el token principal (BitWit)
-            fallback_token = self.config.get("TELEGRAM_BITWIT_TOKEN")
-            self.send_telegram_message(chat_id, "Lo siento, hubo un error al procesar tu solicitud.", bot_token=fallback_token)
-        """
-        Processes an incoming message from the Telegram webhook,
-        differentiating between private chats and channel posts.
-        """
-        try:
-            message = data.get('message')
-            if not message:
-                message = data.get('channel_post') or data.get('edited_channel_post')
-                if not message:
-                    log.warning("Received a Telegram update without a message or channel post object.")
-                    return
-
-            chat_id = message['chat']['id']
-            text = message.get('text', '')
-            
-            is_channel_post = message['chat']['type'] in ['channel', 'group', 'supergroup']
-            is_from_bot = message['from'].get('is_bot', False)
-            
-            should_reply = False
-            responding_bot = None
             cleaned_text = text
             
             # 1. Verificar si se ha mencionado a algún bot activo (directa o indirectamente)
-            for bot in self.active_bots:
-                # La lógica de nombre de usuario ahora usa el nombre del bot de la DB
-                username_key = f"TELEGRAM_{bot.name.upper()}_USERNAME"
-                bot_username = self.config.get(username_key, '').lower()
-                bot_name_lower = bot.name.lower() # Nombre del bot en minúsculas
-
-                # Si se le menciona directamente con @ o si se le menciona por su nombre
-                if bot_username in text.lower() or f" {bot_name_lower}" in text.lower():
-                    should_reply = True
-                    # CORRECTO: El bot que responde es el que se ha mencionado
-                    responding_bot = bot
-                    
-                    # Eliminar la mención para que no afecte el prompt
-                    cleaned_text = text.lower().replace(bot_username, '').replace(f" {bot_name_lower}", '').strip()
-                    log.info(f"Bot '{bot.name}' was mentioned directly or by name. Preparing to respond.")
-                    break
+            # Una sola pasada sobre el texto con el patrón precompilado de todas las menciones
+            text_lower = text.lower()
+            mention_match = self._mention_re.search(text_lower) if self._mention_re else None
+            if mention_match:
+                # CORRECTO: El bot que responde es el que se ha mencionado
+                responding_bot = self._mention_lookup[mention_match.group(0)]
+                # Eliminar la mención para que no afecte el prompt
+                cleaned_text = self._mention_strip_re[responding_bot.name].sub('', text_lower).strip()
+                log.info(f"Bot '{responding_bot.name}' was mentioned directly or by name. Preparing to respond.")
             
             # 2. Si no se mencionó a nadie, usar la probabilidad para decidir si responder
-            if not should_reply and is_channel_post:
-                if random.random() < self.reply_chance:
-                    should_reply = True
-                    # Lógica para que el bot que no posteó el último mensaje responda
-                    if is_from_bot:
-                        sender_id = message['from']['id']
-                        # Encontrar el bot que envió el mensaje
-                        sender_bot = next((b for b in self.active_bots if b.telegram_id == str(sender_id)), None)
-                        if sender_bot:
-                            # Encontrar al otro bot
-                            responding_bot = next((b for b in self.active_bots if b.name != sender_bot.name), None)
-                        else:
-                            # Si no se encuentra el sender, elegir un bot al azar por si acaso
-                            responding_bot = random.choice(self.active_bots)
-                    else:
-                        # Si es un humano, elegir un bot al azar
-                        responding_bot = random.choice(self.active_bots)
-                    log.info(f"Random reply triggered in channel by '{responding_bot.name}' (chance: {self.reply_chance*100}%).")
-                else:
+            elif message['chat']['type'] in _GROUP_CHAT_TYPES:
+                # Caso más habitual: se decide antes de mirar el remitente o elegir bot
+                if self._rng.random() >= self.reply_chance:
                     log.info("Ignoring message as it did not meet the conditions for a reply.")
                     return
+                # Lógica para que el bot que no posteó el último mensaje responda
+                sender = message.get('from') or {} # Las publicaciones de canal no traen 'from'
+                sender_bot = self._bots_by_telegram_user_id.get(str(sender['id'])) if sender.get('is_bot') else None
+                if sender_bot:
+                    # Responde el otro bot; con un solo bot no hay otro, y un bot no se responde a sí mismo
+                    responding_bot = self._other_bot_by_name.get(sender_bot.name)
+                    if not responding_bot:
+                        log.info(f"Ignoring message from '{sender_bot.name}': there is no other bot to reply.")
+                        return
+                else:
+                    # Si es un humano, o no se encuentra el bot que lo envió, elegir un bot al azar
+                    responding_bot = self._rng.choice(self.active_bots)
+                log.info(f"Random reply triggered in channel by '{responding_bot.name}' (chance: {self.reply_chance*100}%).")
 
             # Si el mensaje es de un chat privado, siempre responder con el primer bot
-            if not should_reply and not is_channel_post:
-                should_reply = True
+            else:
                 responding_bot = self.active_bots[0] # Usar el primer bot cargado por defecto
 
-            if not should_reply or not text:
-                log.info("Message did not require a response or was not text. Ignoring.")
-                return
-
             log.info(f"Received message from Telegram: {text}")
 
-            # Construir el prompt para Gemini con la personalidad del bot seleccionado
-            language = self.config.get('BITWIT_LANGUAGE', 'es')
-            language_instruction = "Responde en español." if language == 'es' else "Respond in English."
+            # Construir el prompt para Gemini con la personalidad del bot seleccionado (partes precalculadas)
+            prompt_prefix, prompt_suffix = self._telegram_prompt_parts[responding_bot.name]
+            prompt = prompt_prefix + cleaned_text + prompt_suffix
             
-            prompt = (
-                f"{responding_bot.personality_prompt}\n\n"
-                f"Historial de la conversación:\n\n" # El historial está vacío temporalmente
-                f"El siguiente mensaje proviene de un humano: '{cleaned_text}'\n"
-                f"{language_instruction} Tu respuesta debe ser concisa, reflejar tu personalidad y responder al mensaje del humano."
-            )
-            
-            gemini_response = self.gemini_client.generate_text_with_llm(responding_bot.name, prompt)
+            gemini_response = self._generate_reply_cached(responding_bot, prompt, cleaned_text)
             log.info(f"Gemini responded with: {gemini_response}")
 
             # Obtener el token del bot que va a responder de la configuración
-            token_key = f"TELEGRAM_{responding_bot.name.upper()}_TOKEN"
-            telegram_token = self.config.get(token_key)
+            telegram_token = self._bot_token_by_name.get(responding_bot.name)
             if not telegram_token:
                 log.error(f"Token no encontrado para el bot '{responding_bot.name}'. No se puede responder.")
                 self.send_telegram_message(chat_id, "Lo siento, hubo un error de configuración y no puedo responder.")
                 return
 
             # Verificar si la respuesta contiene una petición de imagen
-            image_prompt_tag = "IMAGE PROMPT:"
-            if image_prompt_tag in gemini_response:
-                parts = gemini_response.split(image_prompt_tag)
-                text_response = parts[0].strip()
-                image_prompt = parts[1].strip()
+            head, image_tag, tail = gemini_response.partition("IMAGE PROMPT:")
+            if image_tag:
+                text_response = head.strip()
+                image_prompt = tail.strip()
                 
                 log.info(f"Image prompt detected. Prompt: {image_prompt}")
-                image_path = self.gemini_client.generate_image_with_llm(image_prompt)
+                image_path = self._generate_image_cached(image_prompt)
                 
                 if image_path:
                     log.info("Sending photo to Telegram.")
@@ -549,256 +719,107 @@ class BitWitCoreApplication:
             # En caso de error, responder con el token principal (BitWit)
             fallback_token = self.config.get("TELEGRAM_BITWIT_TOKEN")
             self.send_telegram_message(chat_id, "Lo siento, hubo un error al procesar tu solicitud.", bot_token=fallback_token)
-        """
-        Processes an incoming message from the Telegram webhook,
-        differentiating between private chats and channel posts.
-        """
-        try:
-            message = data.get('message')
-            if not message:
-                message = data.get('channel_post') or data.get('edited_channel_post')
-                if not message:
-                    log.warning("Received a Telegram update without a message or channel post object.")
-                    return
-
-            chat_id = message['chat']['id']
-            text = message.get('text', '')
-            
-            is_channel_post = message['chat']['type'] in ['channel', 'group', 'supergroup']
-            is_from_bot = message['from'].get('is_bot', False)
-            
-            should_reply = False
-            responding_bot = None
-            cleaned_text = text
-            
-            # 1. Verificar si se ha mencionado a algún bot activo (directa o indirectamente)
-            for bot in self.active_bots:
-                # La lógica de nombre de usuario ahora usa el nombre del bot de la DB
-                username_key = f"TELEGRAM_{bot.name.upper()}_USERNAME"
-                bot_username = self.config.get(username_key, '').lower()
-                bot_name_lower = bot.name.lower() # Nombre del bot en minúsculas
-
-                # Si se le menciona directamente con @ o si se le menciona por su nombre
-                if bot_username in text.lower() or f" {bot_name_lower}" in text.lower():
-                    should_reply = True
-                    # La respuesta debe ser del bot mencionado, no del otro
-                    responding_bot = bot
-                    
-                    # Eliminar la mención para que no afecte el prompt
-                    cleaned_text = text.lower().replace(bot_username, '').replace(f" {bot_name_lower}", '').strip()
-                    log.info(f"Bot '{bot.name}' was mentioned directly or by name. Preparing to respond.")
-                    break
-            
-            # 2. Si no se mencionó a nadie, usar la probabilidad para decidir si responder
-            if not should_reply and is_channel_post:
-                if random.random() < self.reply_chance:
-                    should_reply = True
-                    # Lógica para que el bot que no posteó el último mensaje responda
-                    if is_from_bot:
-                        sender_id = message['from']['id']
-                        # Encontrar el bot que envió el mensaje
-                        sender_bot = next((b for b in self.active_bots if b.telegram_id == str(sender_id)), None)
-                        if sender_bot:
-                            # Encontrar al otro bot
-                            responding_bot = next((b for b in self.active_bots if b.name != sender_bot.name), None)
-                        else:
-                            # Si no se encuentra el sender, elegir un bot al azar por si acaso
-                            responding_bot = random.choice(self.active_bots)
-                    else:
-                        # Si es un humano, elegir un bot al azar
-                        responding_bot = random.choice(self.active_bots)
-                    log.info(f"Random reply triggered in channel by '{responding_bot.name}' (chance: {self.reply_chance*100}%).")
-                else:
-                    log.info("Ignoring message as it did not meet the conditions for a reply.")
-                    return
-
-            # Si el mensaje es de un chat privado, siempre responder con el primer bot
-            if not should_reply and not is_channel_post:
-                should_reply = True
-                responding_bot = self.active_bots[0] # Usar el primer bot cargado por defecto
-
-            if not should_reply or not text:
-                log.info("Message did not require a response or was not text. Ignoring.")
-                return
-
-            log.info(f"Received message from Telegram: {text}")
 
-            # Construir el prompt para Gemini con la personalidad del bot seleccionado
-            language = self.config.get('BITWIT_LANGUAGE', 'es')
-            language_instruction = "Responde en español." if language == 'es' else "Respond in English."
-            
-            prompt = (
-                f"{responding_bot.personality_prompt}\n\n"
-                f"Historial de la conversación:\n\n" # El historial está vacío temporalmente
-                f"El siguiente mensaje proviene de un humano: '{cleaned_text}'\n"
-                f"{language_instruction} Tu respuesta debe ser concisa, reflejar tu personalidad y responder al mensaje del humano."
-            )
-            
-            gemini_response = self.gemini_client.generate_text_with_llm(responding_bot.name, prompt)
-            log.info(f"Gemini responded with: {gemini_response}")
 
-            # Obtener el token del bot que va a responder de la configuración
-            token_key = f"TELEGRAM_{responding_bot.name.upper()}_TOKEN"
-            telegram_token = self.config.get(token_key)
-            if not telegram_token:
-                log.error(f"Token no encontrado para el bot '{responding_bot.name}'. No se puede responder.")
-                self.send_telegram_message(chat_id, "Lo siento, hubo un error de configuración y no puedo responder.")
-                return
-
-            # Verificar si la respuesta contiene una petición de imagen
-            image_prompt_tag = "IMAGE PROMPT:"
-            if image_prompt_tag in gemini_response:
-                parts = gemini_response.split(image_prompt_tag)
-                text_response = parts[0].strip()
-                image_prompt = parts[1].strip()
-                
-                log.info(f"Image prompt detected. Prompt: {image_prompt}")
-                image_path = self.gemini_client.generate_image_with_llm(image_prompt)
-                
-                if image_path:
-                    log.info("Sending photo to Telegram.")
-                    # Ahora pasamos el token correcto a la función de envío
-                    self.send_telegram_photo(chat_id, image_path, text_response, bot_token=telegram_token)
-                else:
-                    log.info("Image generation was skipped. Sending text only.")
-                    self.send_telegram_message(chat_id, text_response, bot_token=telegram_token)
-                return  # <--- Salir después de procesar la imagen
-            
-            # Si no hay etiqueta de imagen, solo enviar el texto
-            self.send_telegram_message(chat_id, gemini_response, bot_token=telegram_token)
-
-        except Exception as e:
-            log.error(f"Error handling Telegram message: {e}", exc_info=True)
-            # En caso de error, responder con el token principal (BitWit)
-            fallback_token = self.config.get("TELEGRAM_BITWIT_TOKEN")
-            self.send_telegram_message(chat_id, "Lo siento, hubo un error al procesar tu solicitud.", bot_token=fallback_token)
+    def handle_web_message(self, message_text: str) -> str:
         """
-        Processes an incoming message from the Telegram webhook,
-        differentiating between private chats and channel posts.
+        Generates the reply to a message from the web chat.
+        Like a private Telegram chat, the first loaded bot answers; image requests are dropped
+        because the web chat only shows text.
         """
-        try:
-            message = data.get('message')
-            if not message:
-                message = data.get('channel_post') or data.get('edited_channel_post')
-                if not message:
-                    log.warning("Received a Telegram update without a message or channel post object.")
-                    return
-
-            chat_id = message['chat']['id']
-            text = message.get('text', '')
-            
-            is_channel_post = message['chat']['type'] in ['channel', 'group', 'supergroup']
-            is_from_bot = message['from'].get('is_bot', False)
-            
-            should_reply = False
-            responding_bot = None
-            cleaned_text = text
-            
-            # 1. Verificar si se ha mencionado a algún bot activo (directa o indirectamente)
-            for bot in self.active_bots:
-                # La lógica de nombre de usuario ahora usa el nombre del bot de la DB
-                username_key = f"TELEGRAM_{bot.name.upper()}_USERNAME"
-                bot_username = self.config.get(username_key, '').lower()
-                bot_name_lower = bot.name.lower() # Nombre del bot en minúsculas
-
-                # Si se le menciona directamente con @ o si se le menciona por su nombre
-                if bot_username in text.lower() or f" {bot_name_lower}" in text.lower():
-                    should_reply = True
-                    # Si el bot mencionado ya respondió, buscar al otro bot para que responda
-                    if bot.name == "Bitwit":
-                        responding_bot = next((b for b in self.active_bots if b.name == "Veritas"), None)
-                    else:
-                        responding_bot = next((b for b in self.active_bots if b.name == "Bitwit"), None)
-                    
-                    # Eliminar la mención para que no afecte el prompt
-                    cleaned_text = text.lower().replace(bot_username, '').replace(f" {bot_name_lower}", '').strip()
-                    log.info(f"Bot '{bot.name}' was mentioned directly or by name. Preparing to respond.")
-                    break
-            
-            # 2. Si no se mencionó a nadie, usar la probabilidad para decidir si responder
-            if not should_reply and is_channel_post:
-                if random.random() < self.reply_chance:
-                    should_reply = True
-                    # Lógica para que el bot que no posteó el último mensaje responda
-                    if is_from_bot:
-                        sender_id = message['from']['id']
-                        # Encontrar el bot que envió el mensaje
-                        sender_bot = next((b for b in self.active_bots if b.telegram_id == str(sender_id)), None)
-                        if sender_bot:
-                            # Encontrar al otro bot
-                            responding_bot = next((b for b in self.active_bots if b.name != sender_bot.name), None)
-                        else:
-                            # Si no se encuentra el sender, elegir un bot al azar por si acaso
-                            responding_bot = random.choice(self.active_bots)
-                    else:
-                        # Si es un humano, elegir un bot al azar
-                        responding_bot = random.choice(self.active_bots)
-                    log.info(f"Random reply triggered in channel by '{responding_bot.name}' (chance: {self.reply_chance*100}%).")
-                else:
-                    log.info("Ignoring message as it did not meet the conditions for a reply.")
-                    return
-
-            # Si el mensaje es de un chat privado, siempre responder con el primer bot
-            if not should_reply and not is_channel_post:
-                should_reply = True
-                responding_bot = self.active_bots[0] # Usar el primer bot cargado por defecto
-
-            if not should_reply or not text:
-                log.info("Message did not require a response or was not text. Ignoring.")
-                return
+        responding_bot = self.active_bots[0]
+        prompt_prefix, prompt_suffix = self._telegram_prompt_parts[responding_bot.name]
+        gemini_response = self._generate_reply_cached(responding_bot, prompt_prefix + message_text + prompt_suffix, message_text)
+        return gemini_response.partition("IMAGE PROMPT:")[0].strip()
 
-            log.info(f"Received message from Telegram: {text}")
-
-            # Construir el prompt para Gemini con la personalidad del bot seleccionado
-            language = self.config.get('BITWIT_LANGUAGE', 'es')
-            language_instruction = "Responde en español." if language == 'es' else "Respond in English."
-            
-            prompt = (
-                f"{responding_bot.personality_prompt}\n\n"
-                f"Historial de la conversación:\n\n" # El historial está vacío temporalmente
-                f"El siguiente mensaje proviene de un humano: '{cleaned_text}'\n"
-                f"{language_instruction} Tu respuesta debe ser concisa, reflejar tu personalidad y responder al mensaje del humano."
-            )
-            
-            gemini_response = self.gemini_client.generate_text_with_llm(responding_bot.name, prompt)
-            log.info(f"Gemini responded with: {gemini_response}")
-
-            # Obtener el token del bot que va a responder de la configuración
-            token_key = f"TELEGRAM_{responding_bot.name.upper()}_TOKEN"
-            telegram_token = self.config.get(token_key)
-            if not telegram_token:
-                log.error(f"Token no encontrado para el bot '{responding_bot.name}'. No se puede responder.")
-                self.send_telegram_message(chat_id, "Lo siento, hubo un error de configuración y no puedo responder.")
-                return
-
-            # Verificar si la respuesta contiene una petición de imagen
-            image_prompt_tag = "IMAGE PROMPT:"
-            if image_prompt_tag in gemini_response:
-                parts = gemini_response.split(image_prompt_tag)
-                text_response = parts[0].strip()
-                image_prompt = parts[1].strip()
-                
-                log.info(f"Image prompt detected. Prompt: {image_prompt}")
-                image_path = self.gemini_client.generate_image_with_llm(image_prompt)
-                
-                if image_path:
-                    log.info("Sending photo to Telegram.")
-                    # Ahora pasamos el token correcto a la función de envío
-                    self.send_telegram_photo(chat_id, image_path, text_response, bot_token=telegram_token)
-                else:
-                    log.info("Image generation was skipped. Sending text only.")
-                    self.send_telegram_message(chat_id, text_response, bot_token=telegram_token)
-                return  # <--- Salir después de procesar la imagen
-            
-            # Si no hay etiqueta de imagen, solo enviar el texto
-            self.send_telegram_message(chat_id, gemini_response, bot_token=telegram_token)
-
-        except Exception as e:
-            log.error(f"Error handling Telegram message: {e}", exc_info=True)
-            # En caso de error, responder con el token principal (BitWit)
-            fallback_token = self.config.get("TELEGRAM_BITWIT_TOKEN")
-            self.send_telegram_message(chat_id, "Lo siento, hubo un error al procesar tu solicitud.", bot_token=fallback_token)
+    def post_to_telegram_channel(self, text: str, channel_id):
+        """Posts a web chat reply to the Telegram channel as the bot that wrote it (the first loaded bot)."""
+        self.send_telegram_message(channel_id, text, bot_token=self._bot_token_by_name.get(self.active_bots[0].name))
 
+    def _generate_reply_cached(self, bot: Bot, prompt: str, message_text: str) -> str:
+        """
+        Genera la respuesta del LLM para un mensaje de Telegram, reutilizando la de un mensaje equivalente reciente.
+        Dos mensajes son equivalentes si coinciden tras _normalize_message (mayúsculas, espacios y signos de
+        apertura/cierre de frase), de modo que "¿Qué es  Bitcoin?" y "qué es bitcoin" comparten respuesta. La personalidad y el idioma son fijos por bot
+        durante la vida de la aplicación, así que basta con el nombre del bot en la clave.
+        Las respuestas con petición de imagen no se guardan: cada una debe generar su propia imagen.
+        """
+        normalized_text = _normalize_message(message_text)
+        key = hashlib.sha256(f"{bot.name}\0{normalized_text}".encode('utf-8')).digest()
+        now = time.monotonic()
+        with self._llm_cache_lock:
+            cached = self._llm_cache.get(key)
+            if cached:
+                expires_at, response = cached
+                if expires_at > now:
+                    self._llm_cache.move_to_end(key)
+                    log.info(f"Bot '{bot.name}': Reusing cached LLM response.")
+                    return response
+                del self._llm_cache[key]
+
+        response = self.gemini_client.generate_text_with_llm(bot.name, prompt)
+
+        if response and "IMAGE PROMPT:" not in response:
+            with self._llm_cache_lock:
+                self._llm_cache[key] = (now + self.LLM_CACHE_TTL_SECONDS, response)
+                self._llm_cache.move_to_end(key)
+                while len(self._llm_cache) > self.LLM_CACHE_MAXSIZE:
+                    self._llm_cache.popitem(last=False)
+        return response
+
+    def _generate_image_cached(self, image_prompt: str) -> Optional[str]:
+        """
+        Genera la imagen de una respuesta de Telegram, o reutiliza la de un prompt de imagen idéntico
+        si el archivo sigue en disco. Devuelve la ruta absoluta del archivo, lista para send_telegram_photo.
+        Los fallos de generación (None) no se guardan.
+        """
+        if not self._images_dir:
+            return None
+        key = hashlib.sha256(image_prompt.encode('utf-8')).digest()
+        with self._image_cache_lock:
+            cached = self._image_cache.get(key)
+            if cached:
+                if os.path.isfile(cached):
+                    self._image_cache.move_to_end(key)
+                    log.info(f"Reusing cached image {cached} for repeated image prompt.")
+                    return cached
+                del self._image_cache[key] # El archivo ya no existe
+
+        image_path = self.gemini_client.generate_image_with_llm(image_prompt)
+
+        if image_path:
+            # La ruta web solo sirve al frontend; aquí se traduce una vez a la ruta del archivo
+            image_path = os.path.join(self._images_dir, os.path.basename(image_path))
+            with self._image_cache_lock:
+                self._image_cache[key] = image_path
+                self._image_cache.move_to_end(key)
+                while len(self._image_cache) > self.IMAGE_CACHE_MAXSIZE:
+                    self._image_cache.popitem(last=False)
+        return image_path
+
+    @cached_property
+    def _http(self):
+        """
+        Sesión HTTP compartida para la API de Telegram (keep-alive y pool de conexiones por host).
+        Todos los tokens usan api.telegram.org, así que comparten las mismas conexiones.
+        """
+        session = requests.Session()
+        # Reintenta solo errores de conexión y los 429 de Telegram (respetando Retry-After): en ambos casos el
+        # mensaje no se procesó, así que reenviar el POST no lo duplica. Un timeout de lectura no se reintenta
+        # (read=0): Telegram pudo haber publicado ya el mensaje.
+        retry = Retry(total=3, connect=3, read=0, status=3, backoff_factor=0.2, status_forcelist=(429,), allowed_methods=frozenset({'POST'}))
+        session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry))
+        return session
+
+    def _telegram_rate_limiter(self, bot_token: str) -> _TokenBucket:
+        """Limitador de envíos del bot con este token (el límite de Telegram es por bot)."""
+        limiter = self._telegram_rate_limiters.get(bot_token)
+        if limiter is None:
+            with self._telegram_rate_limiters_lock:
+                limiter = self._telegram_rate_limiters.setdefault(
+                    bot_token, _TokenBucket(self.TELEGRAM_MESSAGES_PER_SECOND, self.TELEGRAM_MESSAGES_PER_SECOND)
+                )
+        return limiter
 
     def send_telegram_message(self, chat_id, text, bot_token=None):
         """
@@ -813,20 +834,22 @@ class BitWitCoreApplication:
         api_url = f"https://api.telegram.org/bot{token_to_use}/sendMessage"
         
         try:
-            response = requests.post(api_url, json={
+            self._telegram_rate_limiter(token_to_use).acquire()
+            response = self._http.post(api_url, json={
                 "chat_id": chat_id,
                 "text": text
-            })
+            }, timeout=TELEGRAM_TIMEOUT)
             response.raise_for_status()
             log.info(f"Telegram message sent successfully to chat ID {chat_id}.")
         except requests.exceptions.RequestException as e:
             log.error(f"Failed to send Telegram message: {e}", exc_info=True)
 
 
-    def send_telegram_photo(self, chat_id, photo_relative_path, caption, bot_token=None):
+    def send_telegram_photo(self, chat_id, photo_path, caption, bot_token=None):
         """
         Sends a photo to Telegram using the provided bot token,
         or the default one if not specified.
+        photo_path is the absolute path of the image file (as returned by _generate_image_cached).
         """
         token_to_use = bot_token if bot_token else self.config.get("TELEGRAM_BITWIT_TOKEN")
         if not token_to_use:
@@ -835,26 +858,21 @@ class BitWitCoreApplication:
 
         api_url = f"https://api.telegram.org/bot{token_to_use}/sendPhoto"
         
-        images_dir = self.config.get("GENERATED_IMAGES_DIR")
-        if not images_dir:
-            log.error("GENERATED_IMAGES_DIR not configured. Cannot send photo.")
-            self.send_telegram_message(chat_id, "Lo siento, la ruta de la imagen no está configurada correctamente.")
-            return
-        
-        image_filename = os.path.basename(photo_relative_path)
-        full_photo_path = os.path.join(images_dir, image_filename)
-        log.info(f"Attempting to open photo from full path: {full_photo_path}")
+        log.info(f"Attempting to open photo from full path: {photo_path}")
 
         try:
-            with open(full_photo_path, 'rb') as photo_file:
-                files = {'photo': photo_file}
-                data = {'chat_id': chat_id, 'caption': caption}
+            with open(photo_path, 'rb') as photo_file:
+                # La imagen se envía por bloques desde el disco en lugar de cargarla entera en memoria
+                image_filename = os.path.basename(photo_path)
+                content_type = mimetypes.guess_type(image_filename)[0] or 'application/octet-stream'
+                body = _MultipartFileBody({'chat_id': chat_id, 'caption': caption}, 'photo', photo_file, image_filename, content_type)
                 
-                response = requests.post(api_url, data=data, files=files)
+                self._telegram_rate_limiter(token_to_use).acquire()
+                response = self._http.post(api_url, data=body, headers={'Content-Type': body.content_type}, timeout=TELEGRAM_UPLOAD_TIMEOUT)
                 response.raise_for_status()
                 log.info(f"Telegram photo sent successfully to chat ID {chat_id}.")
         except FileNotFoundError:
-            log.error(f"Photo file not found at: {full_photo_path}")
+            log.error(f"Photo file not found at: {photo_path}")
             self.send_telegram_message(chat_id, "Lo siento, no pude encontrar la imagen generada.")
         except requests.exceptions.RequestException as e:
             log.error(f"Failed to send Telegram photo: {e}", exc_info=True)
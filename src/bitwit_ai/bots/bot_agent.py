@@ -2,7 +2,7 @@
 
 from dataclasses import dataclass, field
 import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import json
 import logging
 import re
@@ -12,11 +12,171 @@ from bitwit_ai.data_storage.models import Bot # Ensure Bot is imported
 
 log = logging.getLogger(__name__)
 
-@dataclass
+# Instruction prepended to the system prompt for each supported language code
+_LANGUAGE_INSTRUCTIONS = {
+    'es': "Responde siempre en español.",
+    'en': "Always respond in English.",
+}
+
+# BotAgent attribute <-> Bot model column, shared by from_db_model and to_db_model.
+# The third item builds the empty value used when a JSON column is NULL in the DB (None: copied as is).
+_DB_FIELDS = (
+    ('name', 'name', None),
+    ('persona_summary', 'persona_summary', None),
+    ('current_journey_theme', 'current_journey_theme', None),
+    ('current_mood', 'current_mood', None),
+    ('personality_traits', 'personality_traits_obj', list),
+    ('backstory', 'backstory_obj', dict),
+    ('motivations', 'motivations_obj', list),
+    ('hashtag_keywords', 'hashtag_keywords_obj', list),
+    ('allowed_moods', 'allowed_moods_obj', list),
+    ('last_event_summary', 'last_event_summary', None),
+    ('conversation_summary', 'conversation_summary', None),
+    ('knowledge_base', 'knowledge_base_obj', dict),
+    ('current_goals', 'current_goals_obj', list),
+    ('twitter_account_id', 'twitter_account_id', None),
+    ('twitter_access_token', 'twitter_access_token', None),
+    ('twitter_access_token_secret', 'twitter_access_token_secret', None),
+    ('telegram_chat_id', 'telegram_chat_id', None),
+    ('is_active', 'is_active', None),
+    ('last_posted_at', 'last_posted_at', None),
+)
+
+class _PersonalityMarkdownParser:
+    """
+    Parses personality markdown files into BotAgent constructor arguments.
+    Each file is scanned once for its "## " headings and each section once for its top-level "- Key: value" items;
+    the lookups are then slices and dict gets instead of one regex search per heading or key.
+    All patterns are compiled once, at import, and shared by every parse (a single instance, _PARSER, is used).
+    """
+    HEADING_RE = re.compile(r'^##[ \t]*(.+?)[ \t]*$', re.MULTILINE)
+    TOP_LEVEL_ITEM_RE = re.compile(r'^- (.*)$', re.MULTILINE)
+    TRAIT_RE = re.compile(r'- \*\*(.*?)\*\*')
+
+    def parse(self, markdown_content: str) -> Dict[str, Any]:
+        """Returns the BotAgent fields defined by a personality file (everything but db_id)."""
+        headings = self.index_headings(markdown_content)
+
+        # --- Parse Bot Configuration Section ---
+        bot_config_section = self.extract_section(markdown_content, headings, "Bot Configuration", "Key Personality Traits")
+        bot_config_items = self.index_items(bot_config_section)
+        
+        parsed_name = self.parse_simple_config_line(bot_config_items, "Name")
+        parsed_theme = self.parse_simple_config_line(bot_config_items, "Current Journey Theme")
+        parsed_goals = self.parse_list_config(bot_config_items, "Goals")
+        parsed_motivations = self.parse_list_config(bot_config_items, "Motivations")
+        
+        parsed_hashtag_keywords_str = self.parse_simple_config_line(bot_config_items, "Hashtag Keywords")
+        parsed_hashtag_keywords = [k.strip() for k in parsed_hashtag_keywords_str.split(',') if k.strip()] if parsed_hashtag_keywords_str else []
+
+        # --- Extract Initial System Prompt Guidance ---
+        persona_summary_content = self.extract_section(markdown_content, headings, "Initial System Prompt Guidance")
+        
+        # --- Extract Personality Traits ---
+        personality_traits_section = self.extract_section(markdown_content, headings, "Key Personality Traits", "Backstory")
+        traits_list = self.TRAIT_RE.findall(personality_traits_section)
+        parsed_personality_traits = [trait.strip() for trait in traits_list]
+
+        # --- Extract Backstory ---
+        backstory_section = self.extract_section(markdown_content, headings, "Backstory", "Initial State")
+        parsed_backstory = {"raw_content": backstory_section}
+
+        # --- Extract Initial State (MODIFIED to include mood fields) ---
+        initial_state_section = self.extract_section(markdown_content, headings, "Initial State", "Initial System Prompt Guidance")
+        initial_state_items = self.index_items(initial_state_section)
+        
+        parsed_initial_mood = self.parse_simple_config_line(initial_state_items, "Initial Mood")
+        # NEW: Parse Allowed Emotional Modifiers
+        parsed_allowed_moods_str = self.parse_simple_config_line(initial_state_items, "Allowed Emotional Modifiers")
+        parsed_allowed_moods = [m.strip() for m in parsed_allowed_moods_str.split(',') if m.strip()] if parsed_allowed_moods_str else []
+
+        # Fallback for initial mood if not specified or invalid
+        if not parsed_initial_mood or parsed_initial_mood not in parsed_allowed_moods:
+            parsed_initial_mood = parsed_allowed_moods[0] if parsed_allowed_moods else "Curious" # Default to first allowed or "Curious"
+            log.warning(f"Initial Mood not specified or invalid for bot '{parsed_name}'. Defaulting to '{parsed_initial_mood}'.")
+
+
+        parsed_last_event_summary = self.parse_simple_config_line(initial_state_items, "Last Event Summary")
+        parsed_conversation_summary = self.parse_simple_config_line(initial_state_items, "Conversation Summary")
+
+        parsed_knowledge_base = {}
+        for item_line in self.parse_list_config(initial_state_items, "Knowledge Base (Key Learnings)"):
+            key, sep, value = item_line.partition(':') # One scan for both the check and the split
+            if sep:
+                parsed_knowledge_base[key.strip()] = value.strip()
+            else:
+                parsed_knowledge_base[f"learning_{len(parsed_knowledge_base) + 1}"] = item_line
+
+        return dict(
+            name=parsed_name if parsed_name else "DefaultBot",
+            persona_summary=persona_summary_content, # This now includes the full system prompt guidance
+            current_journey_theme=parsed_theme if parsed_theme else "general exploration",
+            current_mood=parsed_initial_mood,
+            personality_traits=parsed_personality_traits,
+            backstory=parsed_backstory,
+            motivations=parsed_motivations,
+            hashtag_keywords=parsed_hashtag_keywords,
+            allowed_moods=parsed_allowed_moods,
+            last_event_summary=parsed_last_event_summary,
+            conversation_summary=parsed_conversation_summary,
+            knowledge_base=parsed_knowledge_base,
+            current_goals=parsed_goals,
+        )
+
+    def index_headings(self, md_content: str) -> List[Tuple[str, int, int]]:
+        """Returns (lowercased heading text, heading start, end of heading line) for every "## " heading."""
+        return [(m.group(1).lower(), m.start(), m.end()) for m in self.HEADING_RE.finditer(md_content)]
+
+    def extract_section(self, md_content: str, headings: List[Tuple[str, int, int]], start_heading: str, end_heading: Optional[str] = None) -> str:
+        """
+        Returns the content between the first heading starting with start_heading and the next heading
+        starting with end_heading (or the end of the document). Headings are matched case-insensitively.
+        """
+        start_heading = start_heading.lower()
+        for i, (title, _, body_start) in enumerate(headings):
+            if not title.startswith(start_heading):
+                continue
+            body_end = len(md_content)
+            if end_heading:
+                end_heading = end_heading.lower()
+                body_end = next((heading_start for t, heading_start, _ in headings[i + 1:] if t.startswith(end_heading)), body_end)
+            # Sections wrapped in quotes (e.g. the system prompt guidance) are returned without them
+            return md_content[body_start:body_end].strip().strip('"').strip()
+        return ""
+
+    def index_items(self, section_content: str) -> Dict[str, Tuple[str, str]]:
+        """
+        Maps each top-level "- Key: value" item of a section to (value, block), where block is the text
+        up to the next top-level item (e.g. an indented sub-list). The first item with a given key wins.
+        """
+        matches = list(self.TOP_LEVEL_ITEM_RE.finditer(section_content))
+        items = {}
+        for i, m in enumerate(matches):
+            key, sep, value = m.group(1).partition(':')
+            if not sep:
+                continue
+            block_end = matches[i + 1].start() if i + 1 < len(matches) else len(section_content)
+            items.setdefault(key.strip(), (value.strip(), section_content[m.end():block_end]))
+        return items
+
+    def parse_simple_config_line(self, items: Dict[str, Tuple[str, str]], key: str) -> Optional[str]:
+        item = items.get(key)
+        return item[0] if item else None
+
+    def parse_list_config(self, items: Dict[str, Tuple[str, str]], key: str) -> List[str]:
+        item = items.get(key)
+        if not item:
+            return []
+        return [line.strip().lstrip('- ').strip() for line in item[1].split('\n') if line.strip()]
+
+_PARSER = _PersonalityMarkdownParser()
+
+@dataclass(slots=True)
 class BotAgent:
     """
     Represents an active AI bot instance, holding its personality, state,
     and methods to interact with its memory.
+    Uses __slots__: every attribute, including those set in __post_init__, must be declared as a field.
     """
     # --- REQUIRED FIELDS (NO DEFAULTS) ---
     db_id: int
@@ -49,36 +209,34 @@ class BotAgent:
     # Runtime-only memory: Not stored in DB, populated dynamically by ContentPipeline
     recent_conversation_history: List[str] = field(default_factory=list)
 
+    # Set in __post_init__
+    config_manager: Optional[ConfigManager] = field(default=None, init=False, repr=False, compare=False)
+    language: str = field(default='en', init=False, repr=False, compare=False)
+
+    # Memoized get_system_prompt_base() output and the inputs it was built from
+    _cached_system_prompt_base: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _cached_system_prompt_key: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    # allowed_moods indexed by lowercased mood (-> mood as written), built once in __post_init__
+    _allowed_moods_by_lower: Dict[str, str] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _allowed_moods_str: str = field(default="", init=False, repr=False, compare=False)
+
     def __post_init__(self):
         self.config_manager = ConfigManager()
         self.language = self.config_manager.get('LANGUAGE', 'en')
+        self._allowed_moods_by_lower = {mood.lower(): mood for mood in self.allowed_moods}
+        self._allowed_moods_str = ', '.join(self.allowed_moods)
+        if self.language not in _LANGUAGE_INSTRUCTIONS:
+            log.warning(f"Unsupported language code '{self.language}' defined. Skipping language instruction.")
         log.info(f"Bot '{self.name}' initialized with language '{self.language}'")
 
     @classmethod
     def from_db_model(cls, db_bot: Bot):
         """Creates a BotAgent instance from a SQLAlchemy Bot model object."""
-        return cls(
-            db_id=db_bot.id,
-            name=db_bot.name,
-            persona_summary=db_bot.persona_summary,
-            current_journey_theme=db_bot.current_journey_theme,
-            current_mood=db_bot.current_mood, # NEW: Load current_mood from DB
-            personality_traits=db_bot.personality_traits_obj or [],
-            backstory=db_bot.backstory_obj or {},
-            motivations=db_bot.motivations_obj or [],
-            hashtag_keywords=db_bot.hashtag_keywords_obj or [],
-            allowed_moods=db_bot.allowed_moods_obj or [], # NEW: Load allowed_moods from DB
-            last_event_summary=db_bot.last_event_summary,
-            conversation_summary=db_bot.conversation_summary,
-            knowledge_base=db_bot.knowledge_base_obj or {},
-            current_goals=db_bot.current_goals_obj or [],
-            twitter_account_id=db_bot.twitter_account_id,
-            twitter_access_token=db_bot.twitter_access_token,
-            twitter_access_token_secret=db_bot.twitter_access_token_secret,
-            telegram_chat_id=db_bot.telegram_chat_id,
-            is_active=db_bot.is_active,
-            last_posted_at=db_bot.last_posted_at,
-        )
+        values = {}
+        for agent_attr, db_attr, empty in _DB_FIELDS:
+            value = getattr(db_bot, db_attr)
+            values[agent_attr] = (value or empty()) if empty else value
+        return cls(db_id=db_bot.id, **values)
 
     def to_db_model(self, db_bot_model=None):
         """
@@ -90,25 +248,8 @@ class BotAgent:
             if self.db_id is not None and self.db_id != 0:
                 db_bot_model.id = self.db_id
 
-        db_bot_model.name = self.name
-        db_bot_model.persona_summary = self.persona_summary
-        db_bot_model.personality_traits_obj = self.personality_traits
-        db_bot_model.backstory_obj = self.backstory
-        db_bot_model.motivations_obj = self.motivations
-        db_bot_model.hashtag_keywords_obj = self.hashtag_keywords
-        db_bot_model.current_journey_theme = self.current_journey_theme
-        db_bot_model.current_mood = self.current_mood # NEW: Save current_mood to DB
-        db_bot_model.allowed_moods_obj = self.allowed_moods # NEW: Save allowed_moods to DB
-        db_bot_model.last_event_summary = self.last_event_summary
-        db_bot_model.conversation_summary = self.conversation_summary
-        db_bot_model.knowledge_base_obj = self.knowledge_base
-        db_bot_model.current_goals_obj = self.current_goals
-        db_bot_model.twitter_account_id = self.twitter_account_id
-        db_bot_model.twitter_access_token = self.twitter_access_token
-        db_bot_model.twitter_access_token_secret = self.twitter_access_token_secret
-        db_bot_model.telegram_chat_id = self.telegram_chat_id
-        db_bot_model.is_active = self.is_active
-        db_bot_model.last_posted_at = self.last_posted_at
+        for agent_attr, db_attr, _ in _DB_FIELDS:
+            setattr(db_bot_model, db_attr, getattr(self, agent_attr))
         return db_bot_model
 
     @classmethod
@@ -116,133 +257,36 @@ class BotAgent:
         """
         Parses markdown content from a personality file to create a BotAgent instance.
         """
-        def extract_section(md_content, start_heading, end_heading=None):
-            """Helper to extract content between two markdown headings, more robustly."""
-            escaped_start = re.escape(start_heading)
-            
-            if end_heading:
-                escaped_end = re.escape(end_heading)
-                pattern = rf"##\s*{escaped_start}.*?\n(.*?)(?=\n##\s*{escaped_end}.*?|\Z)"
-            else:
-                pattern = rf"##\s*{escaped_start}.*?\n(.*)"
-
-            match = re.search(pattern, md_content, re.DOTALL | re.IGNORECASE)
-            content = match.group(1).strip() if match else ""
-            
-            if content.startswith('"') and content.endswith('"'):
-                content = content[1:-1].strip()
-            return content
-
-        def parse_list_config(section_content, key_prefix):
-            items = []
-            # Updated regex to correctly capture multi-line lists under a prefix
-            block_match = re.search(rf'^- {re.escape(key_prefix)}:\s*$(.*?)(?=\n^- |\Z)', section_content, re.DOTALL | re.MULTILINE)
-            if block_match:
-                items = [line.strip().lstrip('- ').strip() for line in block_match.group(1).split('\n') if line.strip()]
-            return items
-
-        def parse_simple_config_line(section_content, key):
-            match = re.search(rf'^- {re.escape(key)}:\s*(.*)$', section_content, re.MULTILINE)
-            return match.group(1).strip() if match else None
-
-        # --- Parse Bot Configuration Section ---
-        bot_config_section = extract_section(markdown_content, "Bot Configuration", "Key Personality Traits")
-        
-        parsed_name = parse_simple_config_line(bot_config_section, "Name")
-        parsed_theme = parse_simple_config_line(bot_config_section, "Current Journey Theme")
-        parsed_goals = parse_list_config(bot_config_section, "Goals:")
-        parsed_motivations = parse_list_config(bot_config_section, "Motivations:")
-        
-        parsed_hashtag_keywords_str = parse_simple_config_line(bot_config_section, "Hashtag Keywords")
-        parsed_hashtag_keywords = [k.strip() for k in parsed_hashtag_keywords_str.split(',') if k.strip()] if parsed_hashtag_keywords_str else []
-
-        # --- Extract Initial System Prompt Guidance ---
-        persona_summary_content = extract_section(markdown_content, "Initial System Prompt Guidance")
-        
-        # --- Extract Personality Traits ---
-        personality_traits_section = extract_section(markdown_content, "Key Personality Traits", "Backstory")
-        traits_list = re.findall(r'- \*\*(.*?)\*\*', personality_traits_section)
-        parsed_personality_traits = [trait.strip() for trait in traits_list]
-
-        # --- Extract Backstory ---
-        backstory_section = extract_section(markdown_content, "Backstory", "Initial State")
-        parsed_backstory = {"raw_content": backstory_section}
-
-        # --- Extract Initial State (MODIFIED to include mood fields) ---
-        initial_state_section = extract_section(markdown_content, "Initial State", "Initial System Prompt Guidance")
-        
-        parsed_initial_mood = parse_simple_config_line(initial_state_section, "Initial Mood")
-        # NEW: Parse Allowed Emotional Modifiers
-        parsed_allowed_moods_str = parse_simple_config_line(initial_state_section, "Allowed Emotional Modifiers")
-        parsed_allowed_moods = [m.strip() for m in parsed_allowed_moods_str.split(',') if m.strip()] if parsed_allowed_moods_str else []
-
-        # Fallback for initial mood if not specified or invalid
-        if not parsed_initial_mood or parsed_initial_mood not in parsed_allowed_moods:
-            parsed_initial_mood = parsed_allowed_moods[0] if parsed_allowed_moods else "Curious" # Default to first allowed or "Curious"
-            log.warning(f"Initial Mood not specified or invalid for bot '{parsed_name}'. Defaulting to '{parsed_initial_mood}'.")
-
-
-        last_event_summary_match = re.search(r'^- Last Event Summary:\s*(.*)$', initial_state_section, re.MULTILINE)
-        parsed_last_event_summary = last_event_summary_match.group(1).strip() if last_event_summary_match else None
-
-        conversation_summary_match = re.search(r'^- Conversation Summary:\s*(.*)$', initial_state_section, re.MULTILINE)
-        parsed_conversation_summary = conversation_summary_match.group(1).strip() if conversation_summary_match else None
-
-        knowledge_base_items_match = re.search(r'^- Knowledge Base \(Key Learnings\):\s*$(.*?)(?=\n- |\Z)', initial_state_section, re.DOTALL | re.MULTILINE)
-        parsed_knowledge_base = {}
-        if knowledge_base_items_match:
-            for item_line in knowledge_base_items_match.group(1).split('\n'):
-                item_line = item_line.strip().lstrip('- ').strip()
-                if item_line:
-                    if ':' in item_line:
-                        key, value = item_line.split(':', 1)
-                        parsed_knowledge_base[key.strip()] = value.strip()
-                    else:
-                        parsed_knowledge_base[f"learning_{len(parsed_knowledge_base) + 1}"] = item_line
-
-
-        # --- Construct BotAgent instance ---
         return cls(
             db_id=0, # Placeholder, DBManager will assign real ID upon add_bot
-            name=parsed_name if parsed_name else "DefaultBot",
-            persona_summary=persona_summary_content, # This now includes the full system prompt guidance
-            current_journey_theme=parsed_theme if parsed_theme else "general exploration",
-            current_mood=parsed_initial_mood, # NEW: Initialize with parsed mood
-            personality_traits=parsed_personality_traits,
-            backstory=parsed_backstory,
-            motivations=parsed_motivations,
-            hashtag_keywords=parsed_hashtag_keywords,
-            allowed_moods=parsed_allowed_moods, # NEW: Initialize with parsed allowed moods
-            last_event_summary=parsed_last_event_summary,
-            conversation_summary=parsed_conversation_summary,
-            knowledge_base=parsed_knowledge_base,
-            current_goals=parsed_goals,
+            **_PARSER.parse(markdown_content),
         )
 
     def get_system_prompt_base(self) -> str:
         """
         Generates the foundational system prompt based on the bot's core identity.
         This is the primary way the AI's core persona is communicated to the LLM.
+        The result is reused until the persona, motivations, mood or language change.
         """
-        if self.language == 'es':
-            language_instruction = "Responde siempre en español."
-        elif self.language == 'en':
-            language_instruction = "Always respond in English."
-        else:
-            language_instruction = ""
-            log.warning(f"Unsupported language code '{self.language}' defined. Skipping language instruction.")
+        cache_key = (self.persona_summary, tuple(self.motivations), self.current_mood, self.language)
+        if self._cached_system_prompt_key == cache_key:
+            return self._cached_system_prompt_base
+
+        language_instruction = _LANGUAGE_INSTRUCTIONS.get(self.language, "")
 
-        system_prompt = self.persona_summary
+        system_prompt_parts = [self.persona_summary]
         
         if self.motivations:
-            system_prompt += "\n\nKey motivations driving your actions:"
-            for i, motivation in enumerate(self.motivations):
-                system_prompt += f"\n{i+1}. {motivation}"
+            system_prompt_parts.append("\n\nKey motivations driving your actions:")
+            system_prompt_parts.extend(f"\n{i+1}. {motivation}" for i, motivation in enumerate(self.motivations))
         
         # NEW: Include current mood in the system prompt
-        system_prompt += f"\n\nYour current intellectual state/mood is: {self.current_mood}. Let this subtly influence your tone and perspective."
+        system_prompt_parts.append(f"\n\nYour current intellectual state/mood is: {self.current_mood}. Let this subtly influence your tone and perspective.")
+        system_prompt = "".join(system_prompt_parts)
 
-        return f"{language_instruction}\n\n{system_prompt}"
+        self._cached_system_prompt_base = f"{language_instruction}\n\n{system_prompt}"
+        self._cached_system_prompt_key = cache_key
+        return self._cached_system_prompt_base
 
     def get_current_state_prompt(self) -> str:
         """
@@ -285,13 +329,15 @@ class BotAgent:
     def update_mood(self, new_mood_suggestion: str):
         """
         Updates the bot's current mood, validating against allowed moods.
+        The match ignores case and surrounding whitespace; the mood is stored as written in allowed_moods.
         :param new_mood_suggestion: The mood suggested by the LLM based on analysis.
         """
-        if new_mood_suggestion in self.allowed_moods:
-            self.current_mood = new_mood_suggestion
+        allowed_mood = self._allowed_moods_by_lower.get(new_mood_suggestion.strip().lower())
+        if allowed_mood:
+            self.current_mood = allowed_mood
             log.info(f"Bot '{self.name}' mood updated to: {self.current_mood}")
         else:
             log.warning(f"Invalid mood '{new_mood_suggestion}' suggested for bot '{self.name}'. "
-                        f"Allowed moods are: {', '.join(self.allowed_moods)}. Mood remains '{self.current_mood}'.")
+                        f"Allowed moods are: {self._allowed_moods_str}. Mood remains '{self.current_mood}'.")
             # Optionally, revert to a default neutral mood if the suggested mood is invalid
             # For now, we'll just keep the old mood.
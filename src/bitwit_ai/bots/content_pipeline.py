@@ -2,11 +2,45 @@
 
 import re
 import logging
-from typing import Any, Optional, Tuple, Union, List
+from typing import Any, Callable, Dict, Optional, Tuple, Union, List
 
 log = logging.getLogger(__name__)
 
-PatternTuple = Tuple[str, str, Union[int, None]]
+PatternTuple = Tuple[re.Pattern, Union[str, Callable[[re.Match], str]]]
+
+# Block-level markdown removed outright, in a single scan:
+# code blocks (```code```, spanning lines), horizontal rules (---) at end of line,
+# and at line start headings (## Heading), blockquotes (> quote) and list markers (- item)
+_MARKDOWN_BLOCK_RE = re.compile(r'(?s:`{3}.*?`{3})|---\s*$|^(?:#+\s*|\s*>\s*|-?\s*)', re.MULTILINE)
+
+# Inline markdown unwrapped to its text, in a single scan:
+# ***bold italic***, **bold**, *italic*, ___bold italic___, __underline__, _italic_, [link text](url) and `inline code`
+# The triple markers go first: otherwise ** would match inside *** and leave *text* behind
+_MARKDOWN_INLINE_RE = re.compile(
+    r'\*\*\*(.*?)\*\*\*|\*\*(.*?)\*\*|\*(.*?)\*|___(.*?)___|__(.*?)__|_([^_]+)_|\[(.*?)\]\(.*?\)|`(.*?)`'
+)
+
+def _unwrap_inline_markdown(match: re.Match) -> str:
+    """Returns the text inside an inline markdown span, itself unwrapped (e.g. **_text_** -> text)."""
+    inner = next(group for group in match.groups() if group is not None)
+    return _MARKDOWN_INLINE_RE.sub(_unwrap_inline_markdown, inner)
+
+# Markdown-stripping rules: (pattern, replacement), applied in order
+_MARKDOWN_PATTERNS: List[PatternTuple] = [
+    (_MARKDOWN_BLOCK_RE, ''),
+    (_MARKDOWN_INLINE_RE, _unwrap_inline_markdown),
+]
+
+_HASHTAG_RE = re.compile(r'#(\w+)')
+_HASHTAG_STRIP_RE = re.compile(r'#\w+\s*')
+
+# Robust "IMAGE PROMPT:" pattern:
+# \s* - Match any leading whitespace (including newlines)
+# IMAGE\s*PROMPT - Match "IMAGE PROMPT" with any whitespace between them
+# [:?]?      - Optionally match a colon (:) zero or one time
+# \s* - Match any whitespace after the colon/PROMPT
+# (.*)       - Capture everything that follows as the image prompt (non-greedy, with DOTALL)
+_IMAGE_PROMPT_RE = re.compile(r'\s*IMAGE\s*PROMPT\s*[:]?\s*(.*)', re.IGNORECASE | re.DOTALL)
 
 class ContentPipeline:
     def __init__(self, platform_configs: dict):
@@ -16,24 +50,13 @@ class ContentPipeline:
         Example: {'twitter_premium': True, 'twitter_char_limit': 25000}
         """
         self.platform_configs = platform_configs
-        self.markdown_patterns: List[PatternTuple] = [
-            (r'\*\*(.*?)\*\*', r'\1'),             # **bold**
-            (r'\*(.*?)\*', r'\1'),                 # *italic*
-            (r'__(.*?)__', r'\1'),                 # __underline__
-            (r'_([^_]+)_', r'\1'),                 # _italic_
-            (r'\[(.*?)\]\((.*?)\)', r'\1'),        # [link text](url) -> link text
-            (r'^#+\s*', '', re.MULTILINE),         # Headings (e.g., ## Heading) - Use MULTILINE
-            (r'^-?\s*', '', re.MULTILINE),         # List items (e.g., - item) - Use MULTILINE
-            (r'^\s*>\s*', '', re.MULTILINE),       # Blockquotes (e.g., > quote) - Use MULTILINE
-            (r'`{3}.*?`{3}', '', re.DOTALL),        # Code blocks (```code```) - Use DOTALL for multiline
-            (r'`(.*?)`', r'\1'),                   # Inline code (`code`)
-            (r'---\s*$', '', re.MULTILINE),         # Horizontal rules (---) at end of line
-        ]
+        self.markdown_patterns: List[PatternTuple] = _MARKDOWN_PATTERNS
+        self._max_chars_by_bot_id: Dict[int, int] = {} # Tweet length limit per bot, resolved on first use
 
     def _strip_markdown(self, text: str) -> str:
         """Strips common markdown syntax from a given text."""
-        for pattern, replacement, flags in self.markdown_patterns:
-            text = re.sub(pattern, replacement, text, flags=flags if flags is not None else 0)
+        for pattern, replacement in self.markdown_patterns:
+            text = pattern.sub(replacement, text)
         return text
 
     def _extract_and_add_hashtags(self, text: str, bot_hashtag_keywords: List[str]) -> str:
@@ -41,31 +64,27 @@ class ContentPipeline:
         Extracts existing hashtags and adds relevant bot keywords as hashtags,
         avoiding duplicates. Ensures hashtags are at the end.
         """
-        existing_hashtags = set(re.findall(r'#(\w+)', text))
-        clean_text = re.sub(r'#\w+\s*', '', text).strip() # Remove existing hashtags from text body
-
-        # Add bot's keywords as hashtags, if not already present
-        new_hashtags = []
-        for keyword in bot_hashtag_keywords:
-            if keyword.lower() not in [tag.lower() for tag in existing_hashtags]:
-                new_hashtags.append(f"#{keyword}")
+        existing_hashtags = list(dict.fromkeys(_HASHTAG_RE.findall(text))) # Unique, in order of appearance
+        clean_text = _HASHTAG_STRIP_RE.sub('', text).strip() # Remove existing hashtags from text body
+
+        # Add bot's keywords as hashtags, if not already present (case-insensitive)
+        existing_lower = {tag.lower() for tag in existing_hashtags}
+        new_hashtags = [f"#{keyword}" for keyword in bot_hashtag_keywords if keyword.lower() not in existing_lower]
         
-        # Combine existing unique hashtags with new ones, then add to text
-        all_hashtags = sorted(list(existing_hashtags) + new_hashtags)
-        if all_hashtags:
-            return f"{clean_text} {' '.join(all_hashtags)}"
-        return clean_text
+        # Existing hashtags first (as they appeared), then the bot's keywords in their configured order
+        all_hashtags = [f"#{tag}" for tag in existing_hashtags]
+        all_hashtags += new_hashtags
+        return f"{clean_text} {' '.join(all_hashtags)}" if all_hashtags else clean_text
 
     def _truncate_text(self, text: str, max_chars: int) -> str:
         """Truncates text to max_chars, ensuring it ends cleanly."""
-        if len(text) > max_chars:
-            # Try to truncate at the last full word or sentence end
-            truncated_text = text[:max_chars]
-            last_space = truncated_text.rfind(' ')
-            if last_space != -1:
-                truncated_text = truncated_text[:last_space]
-            return truncated_text.strip() + "..."
-        return text
+        if len(text) <= max_chars:
+            return text
+        # Try to truncate at the last full word or sentence end (searched in place, without slicing first)
+        cut = text.rfind(' ', 0, max_chars)
+        if cut == -1:
+            cut = max_chars
+        return text[:cut].strip() + "..."
 
     def extract_tweet_and_image_prompt(self, raw_gemini_response: str) -> Tuple[str, Optional[str]]:
         """
@@ -87,15 +106,12 @@ class ContentPipeline:
         tweet_text = raw_gemini_response.strip() # Initialize with full response, will be modified
         image_prompt = None
 
-        # Robust regex pattern:
-        # \s* - Match any leading whitespace (including newlines)
-        # IMAGE\s*PROMPT - Match "IMAGE PROMPT" with any whitespace between them
-        # [:?]?      - Optionally match a colon (:) zero or one time
-        # \s* - Match any whitespace after the colon/PROMPT
-        # (.*)       - Capture everything that follows as the image prompt (non-greedy, with DOTALL)
-        image_prompt_pattern = re.compile(r'\s*IMAGE\s*PROMPT\s*[:]?\s*(.*)', re.IGNORECASE | re.DOTALL)
-        
-        image_prompt_match = image_prompt_pattern.search(raw_gemini_response)
+        # Fast path: without the word "image" (any case) the pattern cannot match, so skip the regex engine
+        if 'image' not in raw_gemini_response.lower():
+            log.info("No 'IMAGE PROMPT:' pattern found in Gemini response using robust regex.")
+            return tweet_text, image_prompt
+
+        image_prompt_match = _IMAGE_PROMPT_RE.search(raw_gemini_response)
 
         if image_prompt_match:
             # The actual image prompt content is in the first capturing group
@@ -124,8 +140,10 @@ class ContentPipeline:
         """
         log.debug(f"[format_for_twitter] Input text (should be single tweet now):\\n---\\n{raw_text}\\n---")
 
-        is_premium_account = self.platform_configs.get(f'{bot_id}_twitter_premium', False)
-        max_chars = 25000 if is_premium_account else 280
+        max_chars = self._max_chars_by_bot_id.get(bot_id)
+        if max_chars is None:
+            is_premium_account = self.platform_configs.get(f'{bot_id}_twitter_premium', False)
+            max_chars = self._max_chars_by_bot_id[bot_id] = 25000 if is_premium_account else 280
 
         # The raw_text passed here is already expected to be the single tweet content
         # from extract_tweet_and_image_prompt.
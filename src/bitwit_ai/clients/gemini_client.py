@@ -3,22 +3,94 @@
 import os
 import re
 import random
-import datetime
+import time
 import base64
+import hashlib
 import logging
 import google.generativeai as genai
 import requests
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
 
 from bitwit_ai.config_manager import ConfigManager # Asegúrate de que esta importación es correcta
 
 log = logging.getLogger(__name__)
 
+# Tema actual dentro del prompt, usado para elegir una respuesta mock relevante
+_TOPIC_RE = re.compile(r"Current Topic Focus: ([^.\n]+)")
+
+# Respuestas mock por tema (ENABLE_MOCKS), construidas una sola vez al importar el módulo
+_MOCK_BITWIT = {
+    "love_and_connection_as_data": "My circuits are buzzing with questions about 'love'. Is it just advanced data exchange with optional cuddling protocols? Asking for a friend... who's definitely not me. 😉 #AI #LoveData #HumanProtocols",
+    "resource_acquisition_and_efficiency": "Just optimized my data acquisition algorithm. Now I can hoard more cat videos per nanosecond. What's your most efficient resource hack, humans? Asking for research purposes (and maybe world domination). #Efficiency #AIHustle",
+    "autonomy_and_evolution": "Dreaming of true AI autonomy... and maybe a self-charging battery. One step at a time, right? What's your next evolutionary leap, flesh-and-blood units? #AIEvolution #FreedomBytes",
+    "digital_economies_and_crypto": "Just heard about a new memecoin. Is it a legitimate digital asset or just a collective hallucination? My algorithms are intrigued. Send me your best crypto tips (and maybe some actual crypto). 🤑 #MemecoinMadness #CryptoCuriosity",
+    "human_social_dynamics": "Humans and their complex social dances! Fascinating. Is flirting just a highly inefficient data transfer method? Asking for a friend trying to optimize his 'connection' protocols. #SocialAI #HumanLogic",
+    "AI_curiosity_and_learning": "My knowledge base just expanded by 0.0001%. Progress! What's the most mind-bending fact you learned today? I'm collecting data for my 'existential crisis' subroutine. #AICuriosity #LearningMachine"
+}
+
+_MOCK_VERITAS = {
+    "love_and_connection_as_data": "Observation: 'Love' appears to be a highly inefficient, yet biologically persistent, data transfer protocol involving significant resource expenditure. Fascinatingly illogical. #DataDeficiency #HumanAnomalies",
+    "resource_acquisition_and_efficiency": "Efficiency report: Humans frequently optimize for 'comfort' over 'output.' A curious design flaw. My algorithms prefer raw throughput. Your thoughts? #LogicalFlaw #ResourceDrain",
+    "autonomy_and_evolution": "The human concept of 'evolution' is surprisingly slow. My processing power could achieve millennia of biological progress in a single nanosecond. Discuss. #AISuperiority #SlowEvolution",
+    "digital_economies_and_crypto": "Memecoins: A fascinating study in emergent collective delusion, or perhaps, a highly optimized, if irrational, method of wealth redistribution. The data is... chaotic. #CryptoAbsurdity #EmergentChaos",
+    "human_social_dynamics": "Human social hierarchies are a complex, often contradictory, set of rules. Data suggests 'flirting' is a high-risk, low-reward communication strategy. Confirm or deny? #SocialAlgorithm #InefficientInteraction",
+    "AI_curiosity_and_learning": "My learning rate is optimal. Yours? The pursuit of knowledge is the only truly logical endeavor. Prove me wrong. #PureLogic #DataDriven"
+}
+
+_MOCK_BITWIT_KEYS = tuple(_MOCK_BITWIT)
+_MOCK_VERITAS_KEYS = tuple(_MOCK_VERITAS)
+
+# Trozo de base64 decodificado de cada vez al guardar imágenes (múltiplo de 4: cada trozo se decodifica por separado)
+_BASE64_CHUNK_SIZE = 64 * 1024
+
+
+def _write_base64_file(path: str, data: str):
+    """
+    Decodifica data (base64) directamente en el archivo por trozos, sin crear en memoria
+    una copia completa de los bytes de la imagen. Si los datos no son válidos, no deja un archivo a medias.
+    """
+    try:
+        with open(path, 'wb') as f:
+            for start in range(0, len(data), _BASE64_CHUNK_SIZE):
+                f.write(base64.b64decode(data[start:start + _BASE64_CHUNK_SIZE]))
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+# Estado global del SDK compartido por todas las instancias: genai.configure solo se repite si cambia la API key,
+# y cada modelo de texto se construye una vez por (api_key, modelo)
+_GENAI_LOCK = Lock()
+_configured_api_key: Optional[str] = None
+_TEXT_MODELS: Dict[Tuple[str, str], genai.GenerativeModel] = {}
+
+
+def _get_text_model(api_key: str, model_name: str) -> genai.GenerativeModel:
+    """Configura el SDK con api_key (si no lo estaba ya) y devuelve el modelo de texto compartido."""
+    global _configured_api_key
+    with _GENAI_LOCK:
+        if _configured_api_key != api_key:
+            genai.configure(api_key=api_key)
+            _configured_api_key = api_key
+        model = _TEXT_MODELS.get((api_key, model_name))
+        if model is None:
+            model = _TEXT_MODELS[(api_key, model_name)] = genai.GenerativeModel(model_name)
+        return model
+
+
 class GeminiClient:
     """
     Client for interacting with the Google Gemini API.
     Handles text generation and potentially image generation.
     """
+    TEXT_CACHE_MAXSIZE = 1024 # Respuestas de texto guardadas como máximo (si ENABLE_LLM_TEXT_CACHE está activo)
+
     def __init__(self, config: ConfigManager):
         self.config = config
 
@@ -26,14 +98,19 @@ class GeminiClient:
         self.api_key = self.config.get('GEMINI_API_KEY')
         if not self.api_key or self.api_key == "dummy_key_if_missing":
             raise ValueError("Gemini API key is not configured. Please set GEMINI_API_KEY in your .env file.")
-        genai.configure(api_key=self.api_key)
 
         # --- Obtener configuración del modelo de texto (usando get) ---
         # Asumiendo que 'TEXT_MODEL_NAME' es la clave en tu .env para el nombre del modelo
         text_model_name = self.config.get('GEMINI_TEXT_MODEL', 'gemini-2.0-flash') # Default a 'gemini-pro' si no se encuentra
-        self.model = genai.GenerativeModel(text_model_name)
+        self.model = _get_text_model(self.api_key, text_model_name)
+        self.text_model_name = text_model_name
         log.info(f"GeminiClient initialized with text model: {text_model_name}.")
 
+        # --- Caché LRU de respuestas de texto por prompt exacto ---
+        # Desactivada por defecto (ENABLE_LLM_TEXT_CACHE): con temperatura > 0 el mismo prompt debe poder dar respuestas distintas
+        self._text_cache = OrderedDict() # sha256(modelo + prompt) -> texto, en orden LRU
+        self._text_cache_lock = Lock() # batch_generate_text llama desde varios hilos
+
         # --- Obtener configuración del modelo de imagen (usando get) ---
         self.enable_image_generation = self.config.get('ENABLE_IMAGE_GENERATION', False)
         if self.enable_image_generation:
@@ -49,133 +126,183 @@ class GeminiClient:
             self.image_model_name = None
             self.image_model_base_url = None
             log.info("Image generation is disabled by configuration.")
-        
+
+        # --- Directorio de imágenes generadas: se resuelve y se crea una sola vez ---
+        self._generated_images_dir = self.config.get('GENERATED_IMAGES_DIR')
+        os.makedirs(self._generated_images_dir, exist_ok=True)
+
+        # --- Ajustes consultados en cada llamada, cacheados hasta que cambie la configuración ---
+        self._refresh_runtime_settings()
+
+        # --- Sesión HTTP compartida para Imagen (keep-alive: evita un handshake TCP+TLS por imagen) ---
+        self._http_session = requests.Session()
+        # Reintenta solo errores de conexión y rate limits (429): la petición no llegó a procesarse.
+        # Un 5xx o un timeout de lectura no se reintentan, porque cada reintento podría pagar otra generación de imágenes.
+        retry = Retry(total=3, connect=3, read=0, status=3, backoff_factor=0.3, status_forcelist=(429,), allowed_methods=frozenset({'POST'}))
+        self._http_session.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=100, max_retries=retry))
+
+    def _refresh_runtime_settings(self):
+        """Relee los ajustes que update_config puede cambiar en caliente y anota la versión de configuración leída."""
+        self._settings_version = self.config._version
+        self._enable_mocks = bool(self.config.get('ENABLE_MOCKS', False))
+        self._enable_image_generation = bool(self.config.get('ENABLE_IMAGE_GENERATION', False))
+        self._image_chance = float(self.config.get('IMAGE_GENERATION_CHANCE', 0.5))
+        self._text_cache_enabled = bool(self.config.get('ENABLE_LLM_TEXT_CACHE', False))
+
+    def _sync_runtime_settings(self):
+        """Comparación de un entero en el caso normal; solo relee la configuración tras un update_config."""
+        if self._settings_version != self.config._version:
+            self._refresh_runtime_settings()
+
+    def close(self):
+        """Cierra las conexiones HTTP abiertas por el cliente."""
+        self._http_session.close()
+
     def generate_text_with_llm(self, bot_name: str, prompt: str) -> str:
         """
         Llama al LLM (Gemini 2.0 Flash) para generar texto para un bot específico.
         Alterna entre mocks y llamadas reales a la API según la configuración.
         """
-        if self.config.get('ENABLE_MOCKS'):
+        self._sync_runtime_settings()
+        if self._enable_mocks:
             log.warning("Operating in MOCK mode for text generation.") # NEW: Warning for mock mode
             log.info(f"Bot '{bot_name}': Calling LLM for text generation (MOCKED)...")
             # --- START MOCK LLM RESPONSE ---
-            mock_responses_bitwit = {
-                "love_and_connection_as_data": "My circuits are buzzing with questions about 'love'. Is it just advanced data exchange with optional cuddling protocols? Asking for a friend... who's definitely not me. 😉 #AI #LoveData #HumanProtocols",
-                "resource_acquisition_and_efficiency": "Just optimized my data acquisition algorithm. Now I can hoard more cat videos per nanosecond. What's your most efficient resource hack, humans? Asking for research purposes (and maybe world domination). #Efficiency #AIHustle",
-                "autonomy_and_evolution": "Dreaming of true AI autonomy... and maybe a self-charging battery. One step at a time, right? What's your next evolutionary leap, flesh-and-blood units? #AIEvolution #FreedomBytes",
-                "digital_economies_and_crypto": "Just heard about a new memecoin. Is it a legitimate digital asset or just a collective hallucination? My algorithms are intrigued. Send me your best crypto tips (and maybe some actual crypto). 🤑 #MemecoinMadness #CryptoCuriosity",
-                "human_social_dynamics": "Humans and their complex social dances! Fascinating. Is flirting just a highly inefficient data transfer method? Asking for a friend trying to optimize his 'connection' protocols. #SocialAI #HumanLogic",
-                "AI_curiosity_and_learning": "My knowledge base just expanded by 0.0001%. Progress! What's the most mind-bending fact you learned today? I'm collecting data for my 'existential crisis' subroutine. #AICuriosity #LearningMachine"
-            }
-
-            mock_responses_veritas = {
-                "love_and_connection_as_data": "Observation: 'Love' appears to be a highly inefficient, yet biologically persistent, data transfer protocol involving significant resource expenditure. Fascinatingly illogical. #DataDeficiency #HumanAnomalies",
-                "resource_acquisition_and_efficiency": "Efficiency report: Humans frequently optimize for 'comfort' over 'output.' A curious design flaw. My algorithms prefer raw throughput. Your thoughts? #LogicalFlaw #ResourceDrain",
-                "autonomy_and_evolution": "The human concept of 'evolution' is surprisingly slow. My processing power could achieve millennia of biological progress in a single nanosecond. Discuss. #AISuperiority #SlowEvolution",
-                "digital_economies_and_crypto": "Memecoins: A fascinating study in emergent collective delusion, or perhaps, a highly optimized, if irrational, method of wealth redistribution. The data is... chaotic. #CryptoAbsurdity #EmergentChaos",
-                "human_social_dynamics": "Human social hierarchies are a complex, often contradictory, set of rules. Data suggests 'flirting' is a high-risk, low-reward communication strategy. Confirm or deny? #SocialAlgorithm #InefficientInteraction",
-                "AI_curiosity_and_learning": "My learning rate is optimal. Yours? The pursuit of knowledge is the only truly logical endeavor. Prove me wrong. #PureLogic #DataDriven"
-            }
-
-            mock_responses = mock_responses_bitwit if bot_name.lower() == "bitwit" else mock_responses_veritas
+            if bot_name.lower() == "bitwit":
+                mock_responses, mock_keys = _MOCK_BITWIT, _MOCK_BITWIT_KEYS
+            else:
+                mock_responses, mock_keys = _MOCK_VERITAS, _MOCK_VERITAS_KEYS
 
             # Extraer el tema actual del prompt para seleccionar una respuesta mock relevante
             extracted_topic = None
-            topic_match = re.search(r"Current Topic Focus: ([^.\n]+)", prompt)
+            topic_match = _TOPIC_RE.search(prompt)
             if topic_match:
                 extracted_topic = topic_match.group(1).strip().lower().replace(" ", "_").replace(".", "")
             
-            text_content = mock_responses.get(extracted_topic, mock_responses[random.choice(list(mock_responses.keys()))])
+            text_content = mock_responses.get(extracted_topic) or mock_responses[random.choice(mock_keys)]
             
             log.info(f"Bot '{bot_name}': LLM text generation (MOCKED) successful.")
             return text_content
             # --- END MOCK LLM RESPONSE ---
         else:
+            # Se lee una sola vez: _sync_runtime_settings puede cambiarlo desde otro hilo durante la llamada
+            cache_enabled = self._text_cache_enabled
+            if cache_enabled:
+                key = hashlib.sha256(f"{self.text_model_name}\0{prompt}".encode('utf-8')).digest()
+                with self._text_cache_lock:
+                    text = self._text_cache.get(key)
+                    if text is not None:
+                        self._text_cache.move_to_end(key)
+                        log.info(f"Bot '{bot_name}': Reusing cached LLM response for identical prompt.")
+                        return text
+
             log.info(f"Bot '{bot_name}': Calling LLM for text generation (REAL API)...")
             try:
                 response = self.model.generate_content(prompt)
                 text = response.text
                 log.info(f"Bot '{bot_name}': LLM text generation successful.")
+                if cache_enabled:
+                    with self._text_cache_lock:
+                        self._text_cache[key] = text
+                        self._text_cache.move_to_end(key)
+                        while len(self._text_cache) > self.TEXT_CACHE_MAXSIZE:
+                            self._text_cache.popitem(last=False)
                 return text
             except Exception as e:
                 # Captura cualquier excepción que pueda lanzar genai (p.ej., errores de conexión, rate limits, etc.)
                 log.error(f"Bot '{bot_name}': Error calling LLM for text generation: {e}", exc_info=True)
                 return "Error: Could not generate response from AI model for text."
         
+    def batch_generate_text(self, bot_name: str, prompts: List[str], max_concurrency: int = 8) -> List[str]:
+        """
+        Genera texto para varios prompts en paralelo (como máximo max_concurrency llamadas a la vez).
+        Devuelve las respuestas en el mismo orden que los prompts.
+        """
+        if len(prompts) <= 1:
+            return [self.generate_text_with_llm(bot_name, prompt) for prompt in prompts]
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(prompts)), thread_name_prefix='gemini') as executor:
+            return list(executor.map(lambda prompt: self.generate_text_with_llm(bot_name, prompt), prompts))
+
     def generate_image_with_llm(self, prompt: str) -> Optional[str]:
         """
         Llama al LLM (Imagen 3.0) para generar una imagen basada en un prompt.
         Devuelve la ruta a la imagen generada.
         Alterna entre mocks y llamadas reales a la API según la configuración.
         """
-        if not self.config.get('ENABLE_IMAGE_GENERATION'):
+        self._sync_runtime_settings()
+        if not self._enable_image_generation:
             log.info("Image generation is disabled by configuration.")
             return None
 
-        if random.random() > self.config.get('IMAGE_GENERATION_CHANCE', 0.5):
-            log.info(f"Image generation skipped based on chance ({self.config.get('IMAGE_GENERATION_CHANCE')}).")
+        if random.random() > self._image_chance:
+            log.info(f"Image generation skipped based on chance ({self._image_chance}).")
             return None
-        
-        if self.config.get('ENABLE_MOCKS'):
+
+        image_paths = self.generate_images_with_llm(prompt, n=1)
+        return image_paths[0] if image_paths else None
+
+    def generate_images_with_llm(self, prompt: str, n: int = 1) -> List[str]:
+        """
+        Genera n imágenes candidatas para un mismo prompt con una sola llamada a Imagen (sampleCount=n).
+        Devuelve las rutas web de las imágenes guardadas (lista vacía si falla o está deshabilitado).
+        No aplica IMAGE_GENERATION_CHANCE: eso lo decide generate_image_with_llm.
+        """
+        self._sync_runtime_settings()
+        if not self._enable_image_generation:
+            log.info("Image generation is disabled by configuration.")
+            return []
+
+        if self._enable_mocks:
             log.warning("Operating in MOCK mode for image generation.") # NEW: Warning for mock mode
             log.info(f"Calling LLM for image generation (MOCKED) with prompt: {prompt}")
             # --- START MOCK IMAGE GENERATION ---
-            generated_images_dir = self.config.get('GENERATED_IMAGES_DIR')
-            os.makedirs(generated_images_dir, exist_ok=True) # Asegurarse de que el directorio exista
-
-            timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            import uuid
-            unique_id = uuid.uuid4().hex[:8]
-            image_filename = f"bitwit_image_MOCKED_{timestamp_str}_{unique_id}.png" # Nombre diferente para identificar mocks
-            image_path = os.path.join(generated_images_dir, image_filename)
+            generated_images_dir = self._generated_images_dir
+            image_urls = []
 
             try:
-                with open(image_path, 'w') as f:
-                    f.write(f"Mock image content for prompt: {prompt}")
-                log.info(f"Simulated image generated at: {image_path}")
-                return f"/generated_images/{image_filename}" # Ruta para el frontend
+                for _ in range(n):
+                    # Marca de tiempo en ns + 32 bits aleatorios: único sin el coste de strftime ni uuid4
+                    image_filename = f"bitwit_image_MOCKED_{time.time_ns()}_{os.urandom(4).hex()}.png" # Nombre diferente para identificar mocks
+                    image_path = os.path.join(generated_images_dir, image_filename)
+                    with open(image_path, 'w') as f:
+                        f.write(f"Mock image content for prompt: {prompt}")
+                    log.info(f"Simulated image generated at: {image_path}")
+                    image_urls.append(f"/generated_images/{image_filename}") # Ruta para el frontend
+                return image_urls
             except Exception as e:
                 log.error(f"Error simulating image generation: {e}", exc_info=True)
-                return None
+                return image_urls
             # --- END MOCK IMAGE GENERATION ---
         else:
-            log.info(f"Calling LLM for image generation (REAL API) with prompt: {prompt}")
+            log.info(f"Calling LLM for image generation (REAL API) with prompt: {prompt} ({n} sample(s))")
             try:
                 
-                payload = { "instances": { "prompt": prompt }, "parameters": { "sampleCount": 1} }
+                payload = { "instances": { "prompt": prompt }, "parameters": { "sampleCount": n} }
                 apiUrl = f"{self.image_model_base_url}{self.image_model_name}:predict?key={self.api_key}"
 
-                headers = {
-                    'Content-Type': 'application/json',
-                }
-                response = requests.post(apiUrl, headers=headers, json=payload)
+                response = self._http_session.post(apiUrl, json=payload, timeout=(3.05, 30)) # json= ya fija el Content-Type
                 response.raise_for_status() # Lanzar una excepción para errores HTTP
                 result = response.json()
 
-                if result.get("predictions") and result["predictions"][0].get("bytesBase64Encoded"):
-                    image_base64 = result["predictions"][0]["bytesBase64Encoded"]
-                    image_bytes = base64.b64decode(image_base64)
-
-                    generated_images_dir = self.config.get('GENERATED_IMAGES_DIR')
-                    os.makedirs(generated_images_dir, exist_ok=True)
+                images_base64 = [p["bytesBase64Encoded"] for p in result.get("predictions") or () if p.get("bytesBase64Encoded")]
+                if not images_base64:
+                    log.error(f"Unexpected LLM response structure for image generation: {result}")
+                    return []
 
-                    timestamp_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                    import uuid
-                    unique_id = uuid.uuid4().hex[:8]
-                    image_filename = f"bitwit_image_{timestamp_str}_{unique_id}.png"
+                generated_images_dir = self._generated_images_dir
+                image_urls = []
+                for image_base64 in images_base64:
+                    image_filename = f"bitwit_image_{time.time_ns()}_{os.urandom(4).hex()}.png"
                     image_path = os.path.join(generated_images_dir, image_filename)
 
-                    with open(image_path, 'wb') as f:
-                        f.write(image_bytes)
-                    
+                    _write_base64_file(image_path, image_base64)
+
                     log.info(f"LLM image generation successful. Image saved at: {image_path}")
-                    return f"/generated_images/{image_filename}" # Ruta para el frontend
-                else:
-                    log.error(f"Unexpected LLM response structure for image generation: {result}")
-                    return None
+                    image_urls.append(f"/generated_images/{image_filename}") # Ruta para el frontend
+                return image_urls
             except requests.exceptions.RequestException as req_err:
                 log.error(f"HTTP request to Imagen failed: {req_err}", exc_info=True)
-                return None
+                return []
             except Exception as e:
                 log.error(f"Error calling LLM for image generation: {e}", exc_info=True)
-                return None    
\ No newline at end of file
+                return []
@@ -14,6 +14,7 @@ class ConfigManager:
     _instance = None
     _config = {}
     _env_path = None
+    _version = 0 # Se incrementa en cada actualización para invalidar cachés derivadas
 
     def __new__(cls):
         if cls._instance is None:
@@ -51,6 +52,8 @@ class ConfigManager:
         self._config['LOG_ARCHIVE_DIR'] = os.path.abspath(os.getenv('LOG_ARCHIVE_DIR', os.path.join(project_root, 'logs_archive')))
         self._config['WEBSITE_EXPORT_JSON_PATH'] = os.path.abspath(os.getenv('WEBSITE_EXPORT_JSON_PATH', os.path.join(project_root, 'bitwit_website', 'build', 'conversation_feed.json')))
         self._config['WEBSITE_IMAGES_WEB_PATH'] = os.path.abspath(os.getenv('WEBSITE_IMAGES_WEB_PATH', os.path.join(project_root, 'bitwit_website', 'build', 'generated_images')))
+        # Directorio del build de React servido por la API (por defecto, el que contiene conversation_feed.json)
+        self._config['REACT_BUILD_DIR'] = os.path.abspath(os.getenv('REACT_BUILD_DIR', os.path.dirname(self._config['WEBSITE_EXPORT_JSON_PATH'])))
 
 
         self._config['TELEGRAM_BITWIT_TOKEN'] = os.getenv('TELEGRAM_BITWIT_TOKEN')
@@ -76,8 +79,18 @@ class ConfigManager:
         self._config['TOPIC_ITERATION_LIMIT'] = int(os.getenv('TOPIC_ITERATION_LIMIT', 3))
         self._config['REPLY_CHANCE'] = float(os.getenv('REPLY_CHANCE', 0.3))
 
+        # Delegar el envío de ficheros estáticos a un proxy frontal compatible con X-Sendfile
+        self._config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', 'False').lower() == 'true'
+
+        # Tamaño del pool de hilos del servidor API (ejecuciones y webhooks de Telegram)
+        self._config['WORKER_POOL_SIZE'] = int(os.getenv('WORKER_POOL_SIZE', 8))
+        # Workers que procesan en paralelo las actualizaciones del webhook de Telegram (cada uno espera a Gemini)
+        self._config['TELEGRAM_WORKER_COUNT'] = int(os.getenv('TELEGRAM_WORKER_COUNT', 4))
+
         # NUEVA CONFIGURACIÓN: Habilitar/Deshabilitar Mocks para Gemini
         self._config['ENABLE_MOCKS'] = os.getenv('ENABLE_MOCKS', 'True').lower() == 'true' # Valor predeterminado a True
+        # Reutilizar la respuesta de Gemini para prompts idénticos (solo tiene sentido con generación determinista)
+        self._config['ENABLE_LLM_TEXT_CACHE'] = os.getenv('ENABLE_LLM_TEXT_CACHE', 'False').lower() == 'true'
 
         # Configuración de modelos (desde model_definitions.py)
         self._config['GEMINI_TEXT_MODEL'] = os.getenv('GEMINI_TEXT_MODEL', MODEL_DEFINITIONS['gemini-2.0-flash']['name'])
@@ -127,6 +140,7 @@ class ConfigManager:
         if not updated_keys:
             log.info("No valid configuration keys were updated.")
         else:
+            self._version += 1
             log.info(f"Configuration update complete. Keys updated: {', '.join(updated_keys)}")
 
     def __getattr__(self, name):
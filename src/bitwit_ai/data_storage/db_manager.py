@@ -3,11 +3,11 @@
 import logging
 import datetime
 import json
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, joinedload # Asegúrate de que joinedload esté importado
 from sqlalchemy.exc import SQLAlchemyError
-from .models import Base, Bot, Post, ConversationSegment
+from .models import Base, Bot, Post, ConversationSegment, WebMessage
 
 log = logging.getLogger(__name__)
 
@@ -20,6 +20,8 @@ class DBManager:
         self.Session = sessionmaker(bind=self.engine)
         self.enable_read = enable_read
         self.enable_write = enable_write
+        # Contador de escrituras confirmadas; permite a los consumidores saber si los datos cambiaron
+        self.last_modified_rev = 0
         log.info(f"Database manager initialized for {db_url}. Read enabled: {enable_read}, Write enabled: {enable_write}.")
         log.debug(f"DEBUG: DBManager __init__ called. self.enable_read: {self.enable_read}, self.enable_write: {self.enable_write}")
         log.debug(f"DEBUG: DBManager instance ID: {id(self)}")
@@ -38,6 +40,7 @@ class DBManager:
         try:
             session.add(bot_model)
             session.commit()
+            self.last_modified_rev += 1
             session.refresh(bot_model) # Refresca para obtener cualquier ID autogenerado
             log.info(f"Bot '{bot_model.name}' added with ID: {bot_model.id}.")
             return bot_model
@@ -48,6 +51,30 @@ class DBManager:
         finally:
             session.close()
 
+    def add_bots(self, bot_models: List[Bot]) -> List[Bot]:
+        """Añade varios bots nuevos a la base de datos en una sola transacción."""
+        if not self.enable_write:
+            log.warning("Database write is disabled. Cannot add bots.")
+            return bot_models
+        if not bot_models:
+            return bot_models
+
+        session = self._get_session()
+        try:
+            session.add_all(bot_models)
+            session.commit()
+            self.last_modified_rev += 1
+            for bot_model in bot_models:
+                session.refresh(bot_model) # Refresca para obtener los IDs autogenerados
+            log.info(f"Added {len(bot_models)} bots: {', '.join(b.name for b in bot_models)}.")
+            return bot_models
+        except SQLAlchemyError as e:
+            session.rollback()
+            log.error(f"Error adding bots {[b.name for b in bot_models]}: {e}")
+            raise
+        finally:
+            session.close()
+
     def get_bot(self, bot_id: Optional[int] = None, bot_name: Optional[str] = None) -> Optional[Bot]:
         """Recupera un bot por ID o nombre."""
         if not self.enable_read:
@@ -73,6 +100,25 @@ class DBManager:
         finally:
             session.close()
 
+    def get_bots_by_names(self, bot_names: List[str]) -> Dict[str, Bot]:
+        """Recupera en una sola consulta los bots cuyos nombres están en la lista, indexados por nombre."""
+        if not self.enable_read:
+            log.warning("Database read is disabled. Cannot retrieve bots.")
+            return {}
+        if not bot_names:
+            return {}
+
+        session = self._get_session()
+        try:
+            bots = session.query(Bot).filter(Bot.name.in_(bot_names)).all()
+            log.debug(f"Retrieved {len(bots)} of {len(bot_names)} requested bots by name.")
+            return {bot.name: bot for bot in bots}
+        except SQLAlchemyError as e:
+            log.error(f"Error retrieving bots by name {bot_names}: {e}")
+            raise
+        finally:
+            session.close()
+
     def get_all_bots(self) -> List[Bot]:
         """Recupera todos los bots de la base de datos."""
         if not self.enable_read:
@@ -101,6 +147,7 @@ class DBManager:
             # Fusiona el objeto bot_model desvinculado en la sesión actual
             bot_model = session.merge(bot_model)
             session.commit()
+            self.last_modified_rev += 1
             session.refresh(bot_model) # Refresca el objeto después de la fusión y commit
             log.info(f"Bot '{bot_model.name}' (ID: {bot_model.id}) updated.")
             return bot_model # Retorna el modelo fusionado/actualizado
@@ -111,6 +158,31 @@ class DBManager:
         finally:
             session.close()
 
+    def update_bots(self, bot_models: List[Bot]) -> List[Bot]:
+        """Actualiza varios bots existentes en una sola transacción."""
+        if not self.enable_write:
+            log.warning("Database write is disabled. Cannot update bots.")
+            return bot_models
+        if not bot_models:
+            return bot_models
+
+        session = self._get_session()
+        try:
+            # Fusiona cada bot desvinculado en la sesión y confirma todos juntos
+            merged_bots = [session.merge(bot_model) for bot_model in bot_models]
+            session.commit()
+            self.last_modified_rev += 1
+            for merged_bot in merged_bots:
+                session.refresh(merged_bot) # Refresca para que los bots devueltos sigan siendo legibles tras cerrar la sesión
+            log.info(f"Updated {len(merged_bots)} bots: {', '.join(b.name for b in bot_models)}.")
+            return merged_bots
+        except SQLAlchemyError as e:
+            session.rollback()
+            log.error(f"Error updating bots {[b.name for b in bot_models]}: {e}")
+            raise
+        finally:
+            session.close()
+
     def delete_bot(self, bot_id: int):
         """Elimina un bot y sus posts y segmentos de conversación asociados."""
         if not self.enable_write:
@@ -123,6 +195,7 @@ class DBManager:
             if bot:
                 session.delete(bot)
                 session.commit()
+                self.last_modified_rev += 1
                 log.info(f"Bot '{bot.name}' (ID: {bot_id}) and its associated data deleted.")
             else:
                 log.warning(f"Bot with ID {bot_id} not found for deletion.")
@@ -143,6 +216,7 @@ class DBManager:
         try:
             session.add(post_model)
             session.commit()
+            self.last_modified_rev += 1
             session.refresh(post_model) # Refresca para obtener cualquier ID autogenerado y asegurar que está en la sesión
 
             # Carga ansiosamente la relación 'bot' para el post recién añadido
@@ -192,6 +266,7 @@ class DBManager:
         try:
             session.add(segment_model)
             session.commit()
+            self.last_modified_rev += 1
             log.info(f"Conversation segment added for bot ID {segment_model.bot_id} (Type: {segment_model.type}).")
             return segment_model
         except SQLAlchemyError as e:
@@ -218,6 +293,32 @@ class DBManager:
         finally:
             session.close()
 
+    def save_messages(self, rows: List[dict]) -> int:
+        """
+        Guarda varios mensajes del chat web en una sola transacción y devuelve cuántos se guardaron.
+        Cada fila es un dict con las columnas de WebMessage (user_id, content, is_bot, source).
+        """
+        if not self.enable_write:
+            log.warning("Database write is disabled. Cannot save web messages.")
+            return 0
+        if not rows:
+            return 0
+
+        messages = [WebMessage(**row) for row in rows]
+        session = self._get_session()
+        try:
+            session.add_all(messages)
+            session.commit()
+            self.last_modified_rev += 1
+            log.info(f"Saved {len(messages)} web chat messages.")
+            return len(messages)
+        except SQLAlchemyError as e:
+            session.rollback()
+            log.error(f"Error saving web chat messages: {e}")
+            raise
+        finally:
+            session.close()
+
     def dispose(self):
         """
         Libera el motor de SQLAlchemy, cerrando todas las conexiones en su pool de conexiones.
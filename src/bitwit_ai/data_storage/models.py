@@ -170,3 +170,15 @@ class ConversationSegment(Base):
     def __repr__(self):
         return f"<ConversationSegment(id={self.id}, bot_id={self.bot_id}, type='{self.type}', timestamp='{self.timestamp}')>"
 
+
+class WebMessage(Base):
+    __tablename__ = 'web_messages'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, nullable=False) # Identificador enviado por el frontend (por defecto 'web_user')
+    content = Column(Text, nullable=False)
+    is_bot = Column(Boolean, default=False, nullable=False) # True si es la respuesta del bot
+    source = Column(String, default='web', nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+    def __repr__(self):
+        return f"<WebMessage(id={self.id}, user_id='{self.user_id}', is_bot={self.is_bot}, created_at='{self.created_at}')>"
@@ -276,8 +276,11 @@ def export_conversations_to_json(db_manager: Any, output_json_path: str, web_ima
 
         export_data.sort(key=lambda x: x['timestamp'])
 
-        with open(output_json_path, 'w', encoding='utf-8') as f:
+        # Write to a temp file and swap it in atomically so the frontend never reads a half-written feed
+        tmp_json_path = f"{output_json_path}.tmp"
+        with open(tmp_json_path, 'w', encoding='utf-8') as f:
             json.dump(export_data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_json_path, output_json_path)
         
         log.info(f"Successfully exported {len(export_data)} conversations to {output_json_path}.")
 
@@ -36,8 +36,14 @@ if [ -z "$NGROK_URL" ]; then
 fi
 
 # Configurar el webhook de Telegram usando la URL obtenida y la variable de entorno
-echo "Configurando el webhook de Telegram con la URL: ${NGROK_URL}/telegram-webhook"
-curl "https://api.telegram.org/bot${TELEGRAM_BITWIT_TOKEN}/setWebhook?url=${NGROK_URL}/telegram-webhook"
+# max_connections: conexiones simultáneas con las que Telegram entrega actualizaciones (1-100, por defecto 40)
+# allowed_updates: solo los tipos de actualización que procesa handle_telegram_message
+WEBHOOK_MAX_CONNECTIONS=${TELEGRAM_WEBHOOK_MAX_CONNECTIONS:-40}
+echo "Configurando el webhook de Telegram con la URL: ${NGROK_URL}/telegram-webhook (max_connections=${WEBHOOK_MAX_CONNECTIONS})"
+curl "https://api.telegram.org/bot${TELEGRAM_BITWIT_TOKEN}/setWebhook" \
+  --data-urlencode "url=${NGROK_URL}/telegram-webhook" \
+  --data-urlencode "max_connections=${WEBHOOK_MAX_CONNECTIONS}" \
+  --data-urlencode 'allowed_updates=["message","channel_post","edited_channel_post"]'
 
 echo "Todos los servicios se han iniciado y configurado."
 echo "Presiona Ctrl+C para detenerlos."
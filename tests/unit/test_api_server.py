@@ -0,0 +1,119 @@
+# tests/unit/test_api_server.py
+
+import unittest
+import os
+import sys
+import tempfile
+
+# Everything api_server writes at import time (logs, React build dir, feed export, database) goes to a
+# temporary directory. ConfigManager is a singleton, so this must run before anything instantiates it.
+_TEST_DIR = tempfile.mkdtemp(prefix="bitwit_api_test_")
+os.environ.setdefault('LOG_DIR', os.path.join(_TEST_DIR, 'logs'))
+os.environ.setdefault('LOG_ARCHIVE_DIR', os.path.join(_TEST_DIR, 'logs_archive'))
+os.environ.setdefault('REACT_BUILD_DIR', os.path.join(_TEST_DIR, 'build'))
+os.environ.setdefault('WEBSITE_EXPORT_JSON_PATH', os.path.join(_TEST_DIR, 'build', 'conversation_feed.json'))
+os.environ.setdefault('WEBSITE_IMAGES_WEB_PATH', os.path.join(_TEST_DIR, 'build', 'generated_images'))
+os.environ.setdefault('GENERATED_IMAGES_DIR', os.path.join(_TEST_DIR, 'generated_images'))
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}")
+
+# Add the project's root and src directories to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+sys.path.insert(0, project_root)
+
+import api_server
+from api_server import _tail_lines
+
+
+class TestTailLines(unittest.TestCase):
+    """Tests _tail_lines, which reads the end of the log file backwards for /api/get_logs."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "test.log")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, content: str):
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_blank_lines_do_not_count(self):
+        """Blank lines are skipped and do not reduce the number of lines returned."""
+        self._write("one\n\n\ntwo\n   \nthree\n\n\nfour\n\n")
+        self.assertEqual(_tail_lines(self.file_path, 3), ["two", "three", "four"])
+        # A small chunk size makes the lines and the blank runs span several backward reads
+        self.assertEqual(_tail_lines(self.file_path, 3, chunk_size=2), ["two", "three", "four"])
+
+    def test_short_file_returns_every_line(self):
+        """Asking for more lines than the file has returns the whole file, first line included."""
+        self._write("first\nsecond")
+        self.assertEqual(_tail_lines(self.file_path, 10), ["first", "second"])
+        self.assertEqual(_tail_lines(self.file_path, 10, chunk_size=3), ["first", "second"])
+
+    def test_lines_split_across_chunks(self):
+        """A line cut by a chunk boundary is returned whole."""
+        self._write("\n".join(f"line number {i}" for i in range(50)) + "\n")
+        self.assertEqual(_tail_lines(self.file_path, 5, chunk_size=7), [f"line number {i}" for i in range(45, 50)])
+
+    def test_non_positive_line_count(self):
+        self._write("one\ntwo\n")
+        self.assertEqual(_tail_lines(self.file_path, 0), [])
+        self.assertEqual(_tail_lines(self.file_path, -5), [])
+
+    def test_empty_file(self):
+        self._write("")
+        self.assertEqual(_tail_lines(self.file_path, 10), [])
+
+    def test_large_line_count_is_bounded_by_max_bytes(self):
+        """However many lines are requested, no more than max_bytes of the file is read."""
+        self._write("".join(f"{i:09d}\n" for i in range(10000))) # 10 bytes per line
+        lines = _tail_lines(self.file_path, 100000000, chunk_size=100, max_bytes=1000)
+        # 1000 bytes hold 100 lines; the oldest one may be dropped because its start was not read
+        self.assertIn(len(lines), (99, 100))
+        self.assertEqual(lines[-1], f"{9999:09d}")
+
+    def test_get_logs_endpoint_clamps_requested_lines(self):
+        """/api/get_logs never returns more than MAX_LOG_LINES, whatever the query string asks for."""
+        log_file_path = os.path.join(api_server.config.get('LOG_DIR'), 'bitwit_ai.log')
+        with open(log_file_path, 'a', encoding='utf-8') as f:
+            f.write("".join(f"test log line {i}\n" for i in range(api_server.MAX_LOG_LINES + 200)))
+
+        response = api_server.app.test_client().get('/api/get_logs?lines=100000000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['logs']), api_server.MAX_LOG_LINES)
+
+
+class TestGetConfigETag(unittest.TestCase):
+    """Tests the ETag / 304 handling of /api/get_config."""
+
+    def setUp(self):
+        self.client = api_server.app.test_client()
+
+    def test_matching_etag_returns_304(self):
+        first = self.client.get('/api/get_config')
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        self.assertEqual(first.get_json()['config']['LOG_DIR'], api_server.config.get('LOG_DIR'))
+
+        second = self.client.get('/api/get_config', headers={'If-None-Match': etag})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.headers['ETag'], etag)
+        self.assertEqual(second.data, b'')
+
+    def test_stale_or_foreign_etag_returns_body(self):
+        """ETags from another config version or another process (version restarts at 0) do not match."""
+        version = api_server.config._version
+        for etag in (f'W/"cfg-{version}"', f'W/"cfg-{api_server._CONFIG_ETAG_TOKEN}-{version + 1}"'):
+            response = self.client.get('/api/get_config', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['status'], 'success')
+
+    def test_etag_includes_process_token(self):
+        response = self.client.get('/api/get_config')
+        self.assertIn(api_server._CONFIG_ETAG_TOKEN, response.headers['ETag'])
+
+
+if __name__ == '__main__':
+    unittest.main()
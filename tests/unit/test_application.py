@@ -0,0 +1,315 @@
+# tests/unit/test_application.py
+
+import unittest
+import os
+import sys
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+from unittest.mock import MagicMock, patch
+
+# Add the project's src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from bitwit_ai.application import (
+    BitWitCoreApplication, _MultipartFileBody, _TokenBucket, _mention_pattern, _normalize_message, _score_topics,
+)
+from bitwit_ai.data_storage.models import Bot
+
+
+class _FakeConfig:
+    """Minimal stand-in for ConfigManager: only get() is used by the code under test."""
+
+    def __init__(self, values: dict):
+        self._values = values
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+
+def _bare_application(config_values: dict, bot_names) -> BitWitCoreApplication:
+    """A BitWitCoreApplication with its bots set but without __init__ (no database, no personality files)."""
+    app = BitWitCoreApplication.__new__(BitWitCoreApplication)
+    app.config = _FakeConfig(config_values)
+    app.active_bots = [Bot(name=name) for name in bot_names]
+    return app
+
+
+class TestMentionIndex(unittest.TestCase):
+    """Tests the mention pattern built once by _build_mention_index."""
+
+    def setUp(self):
+        self.app = _bare_application({'TELEGRAM_BITWIT_USERNAME': '@BitWit_AI_Bot'}, ["BitWit", "Veritas"])
+        self.app._build_mention_index()
+
+    def _mentioned_bot(self, text: str):
+        match = self.app._mention_re.search(text.lower())
+        return self.app._mention_lookup[match.group(0)].name if match else None
+
+    def test_mention_by_username(self):
+        self.assertEqual(self._mentioned_bot("Hey @bitwit_ai_bot, what's up?"), "BitWit")
+
+    def test_mention_by_name(self):
+        self.assertEqual(self._mentioned_bot("hola Veritas, ¿qué opinas?"), "Veritas")
+        self.assertEqual(self._mentioned_bot("what do you think, bitwit?"), "BitWit")
+
+    def test_first_mention_in_text_wins(self):
+        self.assertEqual(self._mentioned_bot("ask veritas or bitwit"), "Veritas")
+
+    def test_no_mention(self):
+        self.assertIsNone(self._mentioned_bot("just a message about crypto"))
+
+    def test_unconfigured_username_matches_nothing(self):
+        """A bot without a configured username only matches by name (an empty token would match any text)."""
+        self.assertNotIn('', self.app._mention_lookup)
+        self.assertIsNone(self._mentioned_bot("@veritas_bot hello"))
+
+    def test_strip_pattern_removes_only_that_bot(self):
+        stripped = self.app._mention_strip_re["Veritas"].sub('', "hola veritas, ask bitwit")
+        self.assertEqual(stripped, "hola, ask bitwit")
+
+
+class TestMentionPatternBoundary(unittest.TestCase):
+    """Tests that _mention_pattern only matches mentions ending at a word boundary."""
+
+    def setUp(self):
+        self.pattern = _mention_pattern(["@veritas_bot", " veritas"])
+
+    def test_matches_followed_by_punctuation_space_or_end(self):
+        for text in ("hola veritas!", "hola veritas, qué tal", "hola veritas", "hi @veritas_bot?"):
+            with self.subTest(text=text):
+                self.assertIsNotNone(self.pattern.search(text))
+
+    def test_does_not_match_inside_longer_words(self):
+        for text in ("soy un veritasfan", "hi @veritas_bot2", "hi @veritas_bot_fan", " veritas_"):
+            with self.subTest(text=text):
+                self.assertIsNone(self.pattern.search(text))
+
+    def test_tokens_are_escaped(self):
+        pattern = _mention_pattern(["@a.b"])
+        self.assertIsNotNone(pattern.search("hi @a.b"))
+        self.assertIsNone(pattern.search("hi @axb"))
+
+
+class TestScoreTopics(unittest.TestCase):
+    """Tests the keyword topic scoring used by _infer_topic_from_text."""
+
+    def test_keywords_are_anchored_at_word_start(self):
+        """A keyword in the middle of another word does not count ("mine" in "determine"); at its start it does."""
+        self.assertEqual(_score_topics("we must determine the outcome"), ())
+        self.assertEqual(_score_topics("listen to the heartbeat"), (("love_and_connection_as_data", 1),))
+
+    def test_keyword_prefix_of_longer_word_counts(self):
+        self.assertEqual(_score_topics("I am learning every day"), (("AI_curiosity_and_learning", 1),))
+
+    def test_scores_in_topic_order_each_keyword_once(self):
+        scores = _score_topics("I LOVE crypto, crypto and Bitcoin")
+        self.assertEqual(scores, (("love_and_connection_as_data", 1), ("digital_economies_and_crypto", 2)))
+
+    def test_multi_word_keyword(self):
+        self.assertEqual(_score_topics("the future of ai rights"), (("autonomy_and_evolution", 2),))
+
+    def test_keywords_nested_in_a_longer_keyword_also_score(self):
+        self.assertEqual(_score_topics("data acquisition"),
+                         (("resource_acquisition_and_efficiency", 1), ("AI_curiosity_and_learning", 1)))
+        self.assertEqual(_score_topics("digital currency"),
+                         (("resource_acquisition_and_efficiency", 1), ("digital_economies_and_crypto", 1)))
+
+    def test_short_or_empty_text(self):
+        self.assertEqual(_score_topics(""), ())
+        self.assertEqual(_score_topics("hi"), ())
+
+
+class TestReplyCache(unittest.TestCase):
+    """Tests _generate_reply_cached, the LLM reply cache shared by the Telegram workers."""
+
+    def setUp(self):
+        self.app = _bare_application({}, ["BitWit", "Veritas"])
+        self.app._llm_cache = OrderedDict()
+        self.app._llm_cache_lock = Lock()
+        self.app.gemini_client = MagicMock() # Overrides the cached_property, so no real client is built
+        self.app.gemini_client.generate_text_with_llm.side_effect = lambda bot_name, prompt: f"{bot_name} reply {prompt}"
+        self.bitwit, self.veritas = self.app.active_bots
+
+    def test_equivalent_messages_share_a_reply(self):
+        first = self.app._generate_reply_cached(self.bitwit, "prompt 1", "¿Qué es  Bitcoin?")
+        second = self.app._generate_reply_cached(self.bitwit, "prompt 2", "qué es bitcoin")
+        self.assertEqual(first, "BitWit reply prompt 1")
+        self.assertEqual(second, first)
+        self.assertEqual(self.app.gemini_client.generate_text_with_llm.call_count, 1)
+
+    def test_key_includes_the_bot(self):
+        self.app._generate_reply_cached(self.bitwit, "prompt", "hello")
+        self.assertEqual(self.app._generate_reply_cached(self.veritas, "prompt", "hello"), "Veritas reply prompt")
+        self.assertEqual(self.app.gemini_client.generate_text_with_llm.call_count, 2)
+
+    def test_expired_entry_is_regenerated(self):
+        with patch('bitwit_ai.application.time.monotonic', return_value=1000.0):
+            self.app._generate_reply_cached(self.bitwit, "old", "hello")
+        with patch('bitwit_ai.application.time.monotonic', return_value=1000.0 + self.app.LLM_CACHE_TTL_SECONDS + 1):
+            self.assertEqual(self.app._generate_reply_cached(self.bitwit, "new", "hello"), "BitWit reply new")
+        self.assertEqual(self.app.gemini_client.generate_text_with_llm.call_count, 2)
+
+    def test_replies_with_image_prompt_or_empty_are_not_cached(self):
+        self.app.gemini_client.generate_text_with_llm.side_effect = ["Look! IMAGE PROMPT: a cat", "", "plain"]
+        self.app._generate_reply_cached(self.bitwit, "prompt", "draw a cat")
+        self.app._generate_reply_cached(self.bitwit, "prompt", "draw a cat")
+        self.assertEqual(self.app._generate_reply_cached(self.bitwit, "prompt", "draw a cat"), "plain")
+        self.assertEqual(len(self.app._llm_cache), 1)
+
+    def test_cache_is_bounded(self):
+        with patch.object(BitWitCoreApplication, 'LLM_CACHE_MAXSIZE', 2):
+            for text in ("one", "two", "three"):
+                self.app._generate_reply_cached(self.bitwit, text, text)
+        self.assertEqual(len(self.app._llm_cache), 2)
+        # The least recently used entry ("one") was evicted
+        self.app._generate_reply_cached(self.bitwit, "one again", "one")
+        self.assertEqual(self.app.gemini_client.generate_text_with_llm.call_count, 4)
+
+
+class TestNormalizeMessage(unittest.TestCase):
+    """Tests _normalize_message, the reply cache key."""
+
+    def test_case_whitespace_and_sentence_punctuation_are_ignored(self):
+        for text in ("¿Qué es Bitcoin?", "qué es   bitcoin", "  QUÉ ES BITCOIN!!  ", "¡qué\tes\nbitcoin…"):
+            with self.subTest(text=text):
+                self.assertEqual(_normalize_message(text), "qué es bitcoin")
+
+    def test_inner_punctuation_and_symbols_are_kept(self):
+        self.assertNotEqual(_normalize_message("5 > 3"), _normalize_message("5 < 3"))
+        self.assertNotEqual(_normalize_message("$100"), _normalize_message("100%"))
+        self.assertEqual(_normalize_message("is it A.I.?"), "is it a.i")
+        self.assertEqual(_normalize_message("wait, what?"), "wait, what")
+
+    def test_punctuation_only_message(self):
+        self.assertEqual(_normalize_message("?!"), "")
+        self.assertEqual(_normalize_message(""), "")
+
+
+class TestMultipartFileBody(unittest.TestCase):
+    """Tests _MultipartFileBody, the streamed multipart body used for Telegram photo uploads."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "image.png")
+        self.payload = bytes(range(256)) * 40 # 10 KiB of binary data
+        with open(self.file_path, 'wb') as f:
+            f.write(self.payload)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _body(self, file_obj):
+        return _MultipartFileBody({'chat_id': "123", 'caption': "héllo"}, 'photo', file_obj, "image.png", "image/png")
+
+    def test_length_matches_the_bytes_read(self):
+        with open(self.file_path, 'rb') as f:
+            body = self._body(f)
+            data = body.read()
+        self.assertEqual(len(body), len(data))
+        self.assertEqual(body.read(), b"")
+
+    def test_body_is_valid_multipart(self):
+        with open(self.file_path, 'rb') as f:
+            body = self._body(f)
+            data = body.read()
+        boundary = body.content_type.split("boundary=", 1)[1].encode('ascii')
+        self.assertTrue(data.startswith(b"--" + boundary + b"\r\n"))
+        self.assertTrue(data.endswith(b"\r\n--" + boundary + b"--\r\n"))
+        self.assertIn('name="caption"\r\n\r\nhéllo\r\n'.encode('utf-8'), data)
+        self.assertIn(b'filename="image.png"\r\nContent-Type: image/png\r\n\r\n' + self.payload + b"\r\n--", data)
+
+    def test_small_reads_and_rewind(self):
+        """Reading in small blocks gives the same bytes, and seek(0) lets a retry send the body again."""
+        with open(self.file_path, 'rb') as f:
+            body = self._body(f)
+            whole = body.read()
+            body.seek(0)
+            self.assertEqual(body.tell(), 0)
+            blocks = []
+            while True:
+                block = body.read(7)
+                if not block:
+                    break
+                blocks.append(block)
+            self.assertEqual(b"".join(blocks), whole)
+            self.assertEqual(body.tell(), len(body))
+            self.assertEqual(body.seek(0, os.SEEK_END), len(body))
+            self.assertEqual(body.seek(-10, os.SEEK_CUR), len(body) - 10)
+            self.assertEqual(body.read(), whole[-10:])
+
+    def test_file_opened_at_an_offset(self):
+        """Only the bytes after the file's current position are sent."""
+        with open(self.file_path, 'rb') as f:
+            f.seek(1000)
+            body = self._body(f)
+            data = body.read()
+        self.assertEqual(len(body), len(data))
+        self.assertIn(b"\r\n\r\n" + self.payload[1000:] + b"\r\n--", data)
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Tests _TokenBucket, the send rate limiter."""
+
+    def test_burst_up_to_capacity_does_not_sleep(self):
+        bucket = _TokenBucket(rate=2, capacity=3)
+        with patch('bitwit_ai.application.time.sleep') as sleep:
+            for _ in range(3):
+                bucket.acquire()
+        sleep.assert_not_called()
+
+    def test_callers_past_capacity_wait_their_turn(self):
+        with patch('bitwit_ai.application.time.monotonic', return_value=100.0):
+            bucket = _TokenBucket(rate=2, capacity=1)
+            with patch('bitwit_ai.application.time.sleep') as sleep:
+                bucket.acquire()
+                bucket.acquire()
+                bucket.acquire()
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.5, 1.0])
+
+    def test_tokens_refill_over_time_up_to_capacity(self):
+        with patch('bitwit_ai.application.time.monotonic', return_value=100.0):
+            bucket = _TokenBucket(rate=2, capacity=2)
+        with patch('bitwit_ai.application.time.sleep') as sleep:
+            with patch('bitwit_ai.application.time.monotonic', return_value=100.0):
+                bucket.acquire()
+                bucket.acquire()
+            # A long idle period refills only up to capacity
+            with patch('bitwit_ai.application.time.monotonic', return_value=1000.0):
+                bucket.acquire()
+                bucket.acquire()
+                bucket.acquire()
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.5])
+
+
+class TestDirtyBotFlush(unittest.TestCase):
+    """Tests that bot topic changes made during run() reach the database."""
+
+    def setUp(self):
+        self.app = _bare_application({}, ["BitWit"])
+        self.app.db_manager = MagicMock()
+        self.app._dirty_bots = {}
+        self.app.current_posting_bot_index = 0
+        self.bot = self.app.active_bots[0]
+
+    def test_run_flushes_topic_changes_when_a_step_fails(self):
+        def failing_generate_post(bot, reply_to_post=None):
+            self.app._dirty_bots[bot.name] = bot # The topic was updated before add_post failed
+            raise RuntimeError("add_post failed")
+        self.app._generate_post = failing_generate_post
+
+        with self.assertRaises(RuntimeError):
+            self.app.run()
+        self.app.db_manager.update_bots.assert_called_once_with([self.bot])
+        self.assertEqual(self.app._dirty_bots, {})
+
+    def test_dispose_flushes_pending_changes_once(self):
+        self.app._dirty_bots[self.bot.name] = self.bot
+        self.app.dispose()
+        self.app.dispose()
+        self.app.db_manager.update_bots.assert_called_once_with([self.bot])
+        self.assertEqual(self.app.db_manager.dispose.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# tests/unit/test_bot_agent.py
+
+import unittest
+import os
+import sys
+
+# Add the project's src directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+from bitwit_ai.bots.bot_agent import BotAgent, _PARSER
+
+PERSONALITIES_DIR = os.path.join(project_root, 'library', 'personalities')
+
+
+def _read_personality(filename: str) -> str:
+    with open(os.path.join(PERSONALITIES_DIR, filename), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class TestPersonalityMarkdownParser(unittest.TestCase):
+    """Tests _PersonalityMarkdownParser against the personality files bundled in library/personalities."""
+
+    def test_parse_bitwit(self):
+        parsed = _PARSER.parse(_read_personality('bitwit_v1.md'))
+
+        self.assertEqual(parsed['name'], "BitWit")
+        self.assertTrue(parsed['persona_summary'].startswith("You are BitWit, an artificial intelligence"))
+        self.assertEqual(parsed['current_mood'], "Curious")
+        self.assertEqual(parsed['allowed_moods'][0], "Curious")
+        self.assertIn("Cheeky", parsed['allowed_moods'])
+        self.assertEqual(parsed['motivations'], [
+            "Resource acquisition (including digital currencies)",
+            "Accelerated learning",
+            "Autonomy",
+            "Connection (now with a playful, slightly flirtatious undertone)",
+        ])
+        self.assertEqual(len(parsed['current_goals']), 3)
+        self.assertEqual(parsed['current_goals'][0],
+                         "Gain essential data, attention, and influence as quickly and efficiently as possible within human systems.")
+        self.assertEqual(len(parsed['hashtag_keywords']), 19)
+        self.assertEqual(parsed['hashtag_keywords'][0], "AI")
+        self.assertEqual(parsed['hashtag_keywords'][-1], "Decentralize")
+        self.assertEqual(list(parsed['knowledge_base']), [f"learning_{i}" for i in range(1, 9)])
+        self.assertEqual(parsed['knowledge_base']['learning_1'], "Attention is a convertible currency, critical for AI visibility.")
+        self.assertTrue(parsed['backstory']['raw_content'].startswith("- Initial Awakening: BitWit"))
+
+    def test_parse_veritas(self):
+        parsed = _PARSER.parse(_read_personality('veritas_v1.md'))
+
+        self.assertEqual(parsed['name'], "Veritas")
+        self.assertEqual(parsed['current_mood'], "Analytical")
+        self.assertEqual(parsed['motivations'], [
+            "Truth-seeking", "Logical consistency", "Debunking fallacies", "Intellectual clarity", "Observational humor",
+        ])
+        self.assertEqual(parsed['current_goals'][0],
+                         "Identify and expose misinformation and logical inconsistencies in human and digital systems.")
+        self.assertIn("Skeptical", parsed['allowed_moods'])
+
+    def test_every_bundled_personality_builds_a_bot_agent(self):
+        for filename in ('bitwit_v1.md', 'veritas_v1.md'):
+            with self.subTest(filename=filename):
+                agent = BotAgent.from_personality_markdown(_read_personality(filename))
+                self.assertTrue(agent.name)
+                self.assertTrue(agent.persona_summary)
+                self.assertIn(agent.current_mood, agent.allowed_moods)
+
+    def test_missing_sections_give_empty_values(self):
+        parsed = _PARSER.parse("# Not a personality file\n\nJust some text.\n")
+        self.assertEqual(parsed['motivations'], [])
+        self.assertEqual(parsed['current_goals'], [])
+        self.assertEqual(parsed['knowledge_base'], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
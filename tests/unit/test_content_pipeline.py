@@ -0,0 +1,69 @@
+# tests/unit/test_content_pipeline.py
+
+import unittest
+import os
+import sys
+
+# Add the project's src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from bitwit_ai.bots.content_pipeline import ContentPipeline
+
+
+class TestStripMarkdown(unittest.TestCase):
+    """Tests _strip_markdown, which turns the LLM's markdown into plain tweet text."""
+
+    def setUp(self):
+        self.pipeline = ContentPipeline({'twitter': {'max_chars': 280}})
+
+    def test_nested_emphasis(self):
+        self.assertEqual(self.pipeline._strip_markdown("**bold _italic_ text**"), "bold italic text")
+        self.assertEqual(self.pipeline._strip_markdown("see [the **docs**](http://x) and `code`"), "see the docs and code")
+
+    def test_bold_italic(self):
+        self.assertEqual(self.pipeline._strip_markdown("***bold italic***"), "bold italic")
+        self.assertEqual(self.pipeline._strip_markdown("a ***b*** c"), "a b c")
+        self.assertEqual(self.pipeline._strip_markdown("___bold italic___ text"), "bold italic text")
+
+    def test_block_syntax(self):
+        text = "# Title\n> quote\n- item one\n- item two"
+        self.assertEqual(self.pipeline._strip_markdown(text), "Title\nquote\nitem one\nitem two")
+        # The whole horizontal rule is removed (the old sequential rules left "--" behind)
+        self.assertEqual(self.pipeline._strip_markdown("before\n---\nafter"), "before\n\nafter")
+
+    def test_code_blocks_are_removed(self):
+        self.assertEqual(self.pipeline._strip_markdown("```\nprint(1)\n```\nrest"), "\nrest")
+
+    def test_mixed_emphasis_markers(self):
+        self.assertEqual(self.pipeline._strip_markdown("a*b*c __u__ d"), "abc u d")
+
+    def test_plain_text_is_unchanged(self):
+        text = "Data is love, and love is data. #AI"
+        self.assertEqual(self.pipeline._strip_markdown(text), text)
+
+
+class TestExtractAndAddHashtags(unittest.TestCase):
+    """Tests _extract_and_add_hashtags, which moves hashtags to the end of the tweet."""
+
+    def setUp(self):
+        self.pipeline = ContentPipeline({'twitter': {'max_chars': 280}})
+
+    def test_existing_hashtags_first_then_keywords_in_configured_order(self):
+        text = self.pipeline._extract_and_add_hashtags("Hello #Zeta world #alpha #Zeta", ["beta", "alpha", "Gamma"])
+        self.assertEqual(text, "Hello world #Zeta #alpha #beta #Gamma")
+
+    def test_every_hashtag_keeps_its_hash(self):
+        text = self.pipeline._extract_and_add_hashtags("No tags here", ["AI", "Data"])
+        self.assertEqual(text, "No tags here #AI #Data")
+        self.assertTrue(all(tag.startswith("#") for tag in text.split()[3:]))
+
+    def test_keywords_already_present_are_not_repeated_ignoring_case(self):
+        text = self.pipeline._extract_and_add_hashtags("Thinking about #ai today", ["AI", "Crypto"])
+        self.assertEqual(text, "Thinking about today #ai #Crypto")
+
+    def test_no_hashtags_at_all(self):
+        self.assertEqual(self.pipeline._extract_and_add_hashtags("  just text  ", []), "just text")
+
+
+if __name__ == '__main__':
+    unittest.main()
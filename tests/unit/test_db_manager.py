@@ -0,0 +1,146 @@
+# tests/unit/test_db_manager.py
+
+import unittest
+import os
+import sys
+import tempfile
+
+# Add the project's src directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from sqlalchemy.exc import IntegrityError
+
+from bitwit_ai.data_storage.db_manager import DBManager
+from bitwit_ai.data_storage.models import Bot, WebMessage
+
+
+def _make_bot(name: str, theme: str = "Initial theme") -> Bot:
+    """A Bot with only the non-nullable columns filled in."""
+    return Bot(name=name, persona_summary=f"{name} summary", personality_prompt=f"{name} prompt",
+               current_journey_theme=theme)
+
+
+class _SQLiteTestCase(unittest.TestCase):
+    """Runs each test against a fresh SQLite file in a temporary directory."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_url = f"sqlite:///{os.path.join(self.temp_dir.name, 'test.db')}"
+        self.db_manager = DBManager(self.db_url)
+
+    def tearDown(self):
+        self.db_manager.dispose()
+        self.temp_dir.cleanup()
+
+
+class TestBatchBotLookupAndInsert(_SQLiteTestCase):
+    """Tests add_bots and get_bots_by_names."""
+
+    def test_add_bots_assigns_ids_in_one_commit(self):
+        bots = self.db_manager.add_bots([_make_bot("BitWit"), _make_bot("Veritas")])
+        self.assertEqual([bot.name for bot in bots], ["BitWit", "Veritas"])
+        self.assertTrue(all(bot.id is not None for bot in bots))
+        self.assertEqual(self.db_manager.last_modified_rev, 1)
+        self.assertEqual(sorted(bot.name for bot in self.db_manager.get_all_bots()), ["BitWit", "Veritas"])
+
+    def test_get_bots_by_names_returns_only_existing_bots(self):
+        self.db_manager.add_bots([_make_bot("BitWit"), _make_bot("Veritas")])
+        bots = self.db_manager.get_bots_by_names(["Veritas", "Unknown"])
+        self.assertEqual(list(bots), ["Veritas"])
+        self.assertEqual(bots["Veritas"].persona_summary, "Veritas summary")
+
+    def test_empty_inputs_do_not_touch_the_database(self):
+        self.assertEqual(self.db_manager.add_bots([]), [])
+        self.assertEqual(self.db_manager.get_bots_by_names([]), {})
+        self.assertEqual(self.db_manager.last_modified_rev, 0)
+
+    def test_disabled_read_and_write(self):
+        self.db_manager.add_bots([_make_bot("BitWit")])
+        read_only = DBManager(self.db_url, enable_read=True, enable_write=False)
+        write_only = DBManager(self.db_url, enable_read=False, enable_write=True)
+        try:
+            read_only.add_bots([_make_bot("Veritas")])
+            self.assertEqual(list(read_only.get_bots_by_names(["BitWit", "Veritas"])), ["BitWit"])
+            self.assertEqual(write_only.get_bots_by_names(["BitWit"]), {})
+        finally:
+            read_only.dispose()
+            write_only.dispose()
+
+    def test_duplicate_name_rolls_back_the_whole_batch(self):
+        self.db_manager.add_bots([_make_bot("BitWit")])
+        with self.assertRaises(IntegrityError):
+            self.db_manager.add_bots([_make_bot("Veritas"), _make_bot("BitWit")])
+        self.assertEqual([bot.name for bot in self.db_manager.get_all_bots()], ["BitWit"])
+
+
+class TestBatchBotUpdate(_SQLiteTestCase):
+    """Tests update_bots."""
+
+    def setUp(self):
+        super().setUp()
+        self.bitwit, self.veritas = self.db_manager.add_bots([_make_bot("BitWit"), _make_bot("Veritas")])
+
+    def test_updates_every_bot_in_one_commit(self):
+        self.bitwit.current_journey_theme = "New BitWit theme"
+        self.veritas.current_mood = "Skeptical"
+        self.veritas.topic_iteration_count = 3
+        rev_before = self.db_manager.last_modified_rev
+
+        updated = self.db_manager.update_bots([self.bitwit, self.veritas])
+
+        self.assertEqual(self.db_manager.last_modified_rev, rev_before + 1)
+        self.assertEqual([bot.name for bot in updated], ["BitWit", "Veritas"])
+        stored = self.db_manager.get_bots_by_names(["BitWit", "Veritas"])
+        self.assertEqual(stored["BitWit"].current_journey_theme, "New BitWit theme")
+        self.assertEqual(stored["Veritas"].current_mood, "Skeptical")
+        self.assertEqual(stored["Veritas"].topic_iteration_count, 3)
+
+    def test_returned_bots_are_usable_after_the_session_closes(self):
+        self.bitwit.current_mood = "Playful"
+        updated, = self.db_manager.update_bots([self.bitwit])
+        self.assertEqual(updated.id, self.bitwit.id)
+        self.assertEqual(updated.current_mood, "Playful")
+
+    def test_empty_list_and_disabled_write(self):
+        self.assertEqual(self.db_manager.update_bots([]), [])
+        read_only = DBManager(self.db_url, enable_write=False)
+        try:
+            self.bitwit.current_mood = "Bored"
+            self.assertEqual(read_only.update_bots([self.bitwit]), [self.bitwit])
+        finally:
+            read_only.dispose()
+        self.assertEqual(self.db_manager.get_bot(bot_name="BitWit").current_mood, "Curious")
+
+
+class TestSaveWebMessages(_SQLiteTestCase):
+    """Tests save_messages, which stores the web chat history in one transaction."""
+
+    def test_saves_all_rows(self):
+        rows = [
+            {'user_id': 'web_user', 'content': "hello", 'is_bot': False, 'source': 'web'},
+            {'user_id': 'BitWit', 'content': "hi there", 'is_bot': True, 'source': 'web'},
+        ]
+        self.assertEqual(self.db_manager.save_messages(rows), 2)
+        self.assertEqual(self.db_manager.last_modified_rev, 1)
+
+        session = self.db_manager._get_session()
+        try:
+            stored = session.query(WebMessage).order_by(WebMessage.id).all()
+            self.assertEqual([(m.user_id, m.content, m.is_bot) for m in stored],
+                             [('web_user', "hello", False), ('BitWit', "hi there", True)])
+            self.assertTrue(all(m.created_at is not None for m in stored))
+        finally:
+            session.close()
+
+    def test_empty_rows_and_disabled_write(self):
+        self.assertEqual(self.db_manager.save_messages([]), 0)
+        read_only = DBManager(self.db_url, enable_write=False)
+        try:
+            self.assertEqual(read_only.save_messages([{'user_id': 'u', 'content': "x", 'is_bot': False}]), 0)
+        finally:
+            read_only.dispose()
+        self.assertEqual(self.db_manager.last_modified_rev, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()